@@ -1,4 +1,5 @@
 # MedRx Platform Configuration
+import os
 
 # Supported Regions & Timezones
 SUPPORTED_REGIONS = {
@@ -83,6 +84,12 @@ VISIT_DURATIONS = {
     "Functional Medicine": 45
 }
 
+# Slot grid step (minutes) - matches the 15 minute grid in the booking UI
+SLOT_INCREMENT_MINUTES = 15
+
+# Longest date range a single availability search may cover (days)
+MAX_AVAILABILITY_RANGE_DAYS = 31
+
 # Intake Schema Structure
 INTAKE_SCHEMA = {
     "demographics": {
@@ -239,3 +246,10 @@ SMS_ALERT_NUMBER = os.getenv("SMS_ALERT_NUMBER", "+16716892993")
 
 # DrChrono Calendar Link
 DRCHRONO_CALENDAR_LINK = os.getenv("DRCHRONO_CALENDAR_LINK", "https://calendar.drchrono.com/medrx")
+
+# Slot Reservations
+# Single-provider practice today; reservations are keyed per provider so
+# additional providers can be added without changing the unique index.
+DEFAULT_PROVIDER_ID = os.getenv("DEFAULT_PROVIDER_ID", "medrx-primary")
+# How long an unpaid (pending_payment) booking holds its slot
+SLOT_HOLD_MINUTES = int(os.getenv("SLOT_HOLD_MINUTES", "30"))
@@ -0,0 +1,61 @@
+from fastapi import HTTPException, status
+from bson import ObjectId
+from pymongo import ReturnDocument
+from typing import Any, Dict, Optional
+
+from serialization import with_id
+
+
+def parse_object_id(value: str, label: str) -> ObjectId:
+    """
+    ObjectId from a path parameter
+
+    Raises:
+        HTTPException: 400 'Invalid <label> ID' if the value is not an ObjectId
+    """
+    try:
+        return ObjectId(value)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {label} ID"
+        )
+
+
+async def update_by_id(
+    collection,
+    document_id: str,
+    fields: Dict[str, Any],
+    label: str,
+    projection: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    $set `fields` on one document and return the updated document.
+
+    One find_one_and_update round trip replaces find_one -> update_one -> find_one.
+
+    Args:
+        collection: Motor collection
+        document_id: ObjectId string from the path
+        fields: Fields to $set
+        label: Resource name for error messages ('appointment')
+        projection: Fields to return (default: all)
+
+    Returns:
+        Updated document with an `id` field (render with BSONJSONResponse)
+
+    Raises:
+        HTTPException: 400 for a malformed id, 404 if no document matches
+    """
+    updated = await collection.find_one_and_update(
+        {"_id": parse_object_id(document_id, label)},
+        {"$set": fields},
+        projection=projection,
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"{label.capitalize()} not found"
+        )
+    return with_id(updated)
@@ -1,12 +1,208 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from dotenv import load_dotenv
 from pathlib import Path
+import asyncio
 import os
+import time
+import logging
+from typing import List
+
+from metrics import MongoCommandMetrics
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+logger = logging.getLogger(__name__)
+
+# Connection pool settings, sized per Uvicorn worker. Unset variables
+# keep the driver defaults (maxPoolSize=100, minPoolSize=0, ...).
+POOL_OPTION_ENV = {
+    "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+    "minPoolSize": "MONGO_MIN_POOL_SIZE",
+    "maxIdleTimeMS": "MONGO_MAX_IDLE_TIME_MS",
+    "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    "serverSelectionTimeoutMS": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+    "connectTimeoutMS": "MONGO_CONNECT_TIMEOUT_MS",
+    "socketTimeoutMS": "MONGO_SOCKET_TIMEOUT_MS",
+}
+
+
+def pool_options_from_env() -> dict:
+    """Read Motor connection pool options from the environment"""
+    options = {}
+    for option, env_var in POOL_OPTION_ENV.items():
+        value = os.environ.get(env_var)
+        if value:
+            options[option] = int(value)
+    return options
+
+
+# MongoDB connection - the only client in the process. Routers and
+# services import `db` from here rather than opening their own pools.
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
\ No newline at end of file
+client = AsyncIOMotorClient(
+    mongo_url,
+    appname="medrx-backend",
+    # Per-command round-trip times for /api/metrics
+    event_listeners=[MongoCommandMetrics()],
+    **pool_options_from_env()
+)
+db = client[os.environ['DB_NAME']]
+
+# Shared by every services.job_queue.JobQueue collection
+JOB_QUEUE_INDEXES = [
+    # JobQueue claims: due pending jobs and expired leases
+    IndexModel([("status", ASCENDING), ("nextAttemptAt", ASCENDING)], name="job_status_due"),
+    IndexModel([("dedupeKey", ASCENDING)], name="job_dedupe", unique=True, sparse=True),
+    # finished jobs are kept for a week for troubleshooting
+    IndexModel([("finishedAt", ASCENDING)], name="job_finished_expiry", expireAfterSeconds=7 * 24 * 3600),
+]
+
+# Indexes backing the lookups in routes/. Keyed by collection; every
+# query filter used on a request path should be covered by one of these.
+INDEXES = {
+    "appointments": [
+        # schedule and overlap queries: one range scan on the UTC start
+        IndexModel([("startUtc", ASCENDING), ("status", ASCENDING)], name="appointment_start_status"),
+        # get_appointments_by_email and the history pages: by user, newest first
+        IndexModel(
+            [("userId", ASCENDING), ("startUtc", DESCENDING), ("_id", DESCENDING)],
+            name="appointment_user_history"
+        ),
+        # payment events find bookings made after checkout by session id
+        IndexModel([("paymentSessionId", ASCENDING)], name="appointment_payment_session", sparse=True),
+    ],
+    "slot_reservations": [
+        # one reservation per provider slot; the booking path relies on this
+        IndexModel(
+            [("providerId", ASCENDING), ("date", ASCENDING), ("time", ASCENDING)],
+            name="slot_reservation_unique", unique=True
+        ),
+        # unpaid holds expire at expiresAt; confirmed reservations have no expiresAt
+        IndexModel([("expiresAt", ASCENDING)], name="slot_reservation_hold_expiry", expireAfterSeconds=0),
+        IndexModel([("appointmentId", ASCENDING)], name="slot_reservation_appointment"),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="user_email", unique=True),
+    ],
+    "payment_transactions": [
+        IndexModel([("sessionId", ASCENDING)], name="payment_session", unique=True),
+    ],
+    "notification_jobs": JOB_QUEUE_INDEXES,
+    "payment_jobs": JOB_QUEUE_INDEXES,
+    "transcript_jobs": JOB_QUEUE_INDEXES,
+    "stripe_webhook_events": [
+        # one row per Stripe event; redelivered events are dropped on insert
+        IndexModel([("eventId", ASCENDING)], name="webhook_event_id", unique=True),
+        IndexModel([("status", ASCENDING), ("receivedAt", ASCENDING)], name="webhook_event_status"),
+        IndexModel([("receivedAt", ASCENDING)], name="webhook_event_expiry", expireAfterSeconds=90 * 24 * 3600),
+    ],
+    "llm_extraction_cache": [
+        IndexModel([("expiresAt", ASCENDING)], name="extraction_cache_expiry", expireAfterSeconds=0),
+        # size-based eviction removes the least recently used first
+        IndexModel([("lastUsedAt", ASCENDING)], name="extraction_cache_last_used"),
+    ],
+    "subscriptions": [
+        IndexModel([("userId", ASCENDING), ("status", ASCENDING)], name="subscription_user_status"),
+    ],
+}
+
+# How often to log progress while a single index build is running
+INDEX_PROGRESS_INTERVAL_SECONDS = 5
+
+
+async def _log_index_build_progress(database, collection_name: str):
+    """Periodically log createIndexes progress reported by $currentOp"""
+    while True:
+        await asyncio.sleep(INDEX_PROGRESS_INTERVAL_SECONDS)
+        try:
+            ops = await database.client.admin.aggregate([
+                {"$currentOp": {}},
+                {"$match": {"command.createIndexes": collection_name}}
+            ]).to_list(None)
+        except Exception:
+            # $currentOp needs clusterMonitor; progress logging is best effort
+            return
+        for op in ops:
+            progress = op.get("progress") or {}
+            if progress.get("total"):
+                logger.info(
+                    f"Index build on {collection_name}: {progress.get('done', 0)}/{progress['total']} "
+                    f"({op.get('msg', 'building')})"
+                )
+
+
+async def _check_unique_duplicates(database, collection_name: str, models: List[IndexModel]):
+    """
+    Refuse to build a unique index over existing duplicate keys.
+
+    The build itself would fail with a bare duplicate key error; this names
+    the index and the documents to merge or remove first.
+
+    Indexes that already exist are skipped, so this only costs a
+    collection scan on the deploy that first adds the index.
+
+    Raises:
+        RuntimeError: if any unique index in `models` has duplicate keys
+    """
+    existing = await database[collection_name].index_information()
+    for model in models:
+        spec = model.document
+        if not spec.get("unique") or spec["name"] in existing:
+            continue
+        fields = list(spec["key"].keys())
+        match = {field: {"$exists": True} for field in fields} if spec.get("sparse") else {}
+        duplicates = await database[collection_name].aggregate([
+            {"$match": match},
+            {"$group": {"_id": {field: f"${field}" for field in fields}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$limit": 5}
+        ], allowDiskUse=True).to_list(5)
+        if duplicates:
+            # Report document ids, not key values - keys such as email are patient data
+            examples = "; ".join(", ".join(str(_id) for _id in group["ids"]) for group in duplicates)
+            raise RuntimeError(
+                f"Cannot build unique index {spec['name']} on {collection_name}: duplicate "
+                f"{', '.join(fields)} values exist (e.g. documents {examples}). "
+                f"Merge or remove the duplicates, then restart."
+            )
+
+
+async def ensure_indexes(database=None):
+    """
+    Create every index in INDEXES, logging progress as each build runs.
+
+    Raises if any build fails so the app refuses to start serving
+    queries that would otherwise fall back to collection scans. Unique
+    indexes are checked for existing duplicates first so that failure
+    explains what to fix.
+    """
+    database = database if database is not None else db
+
+    total = sum(len(models) for models in INDEXES.values())
+    built = 0
+    started = time.monotonic()
+
+    for collection_name, models in INDEXES.items():
+        names = ", ".join(model.document["name"] for model in models)
+        logger.info(f"Ensuring indexes on {collection_name}: {names}")
+
+        collection_started = time.monotonic()
+        progress_task = asyncio.create_task(_log_index_build_progress(database, collection_name))
+        try:
+            await _check_unique_duplicates(database, collection_name, models)
+            await database[collection_name].create_indexes(models)
+        except Exception as e:
+            logger.error(f"Index build failed on {collection_name}: {e}")
+            raise
+        finally:
+            progress_task.cancel()
+
+        built += len(models)
+        logger.info(
+            f"Indexes ready on {collection_name} in {time.monotonic() - collection_started:.2f}s "
+            f"({built}/{total})"
+        )
+
+    logger.info(f"All {total} indexes ready in {time.monotonic() - started:.2f}s")
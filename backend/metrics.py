@@ -0,0 +1,232 @@
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+from pymongo import monitoring
+
+# Latency buckets in seconds, from fast Mongo lookups to slow LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        # Observations come from the event loop and from pymongo's monitoring threads
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, labels)} {value}" for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, seconds: float, *labels: str):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += seconds
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._values.items()]
+        lines = self.header()
+        for labels, series in items:
+            for bound, count in zip(self.buckets, series):
+                bucket_labels = _labels(self.label_names, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            total = series[len(self.buckets)]
+            inf_labels = _labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf_labels} {total}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {total}")
+        return lines
+
+
+class Registry:
+    """Metrics plus collectors that read other components' counters at scrape time"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]):
+        """`collector()` returns Prometheus text lines (HELP/TYPE included)"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status")
+))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+    ("method",)
+))
+DEPENDENCY_DURATION = REGISTRY.register(Histogram(
+    "dependency_call_duration_seconds",
+    "Latency of awaited calls to external services",
+    ("dependency", "operation", "outcome")
+))
+LLM_REQUESTS_WAITING = REGISTRY.register(Gauge(
+    "llm_requests_waiting",
+    "LLM calls queued behind the concurrency limit"
+))
+LLM_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "llm_requests_in_flight",
+    "LLM calls currently awaiting a response"
+))
+
+
+def gauge_lines(name: str, help_text: str, values: Dict[str, float]) -> List[str]:
+    """Prometheus lines for a set of unlabelled gauges named <name>_<key>"""
+    lines = []
+    for key, value in values.items():
+        if isinstance(value, (int, float)):
+            metric = f"{name}_{key}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge", f"{metric} {value}"]
+    return lines
+
+
+@asynccontextmanager
+async def track_dependency(dependency: str, operation: str):
+    """
+    Time an awaited external call
+
+        async with track_dependency("stripe", "get_checkout_status"):
+            await stripe_checkout.get_checkout_status(session_id)
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        DEPENDENCY_DURATION.observe(time.perf_counter() - start, dependency, operation, outcome)
+
+
+def route_template(scope) -> str:
+    """Path template of the matched route ('/api/appointments/{appointment_id}')"""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    # Unmatched paths are not recorded individually - they may contain identifiers
+    return path or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status codes and in-flight
+    requests per route template. Streaming responses are timed until
+    their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "")
+        status_code = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc(method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(method)
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start, method, route_template(scope), str(status_code[0])
+            )
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener feeding Mongo round-trip times into dependency_call_duration_seconds"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        DEPENDENCY_DURATION.observe(event.duration_micros / 1e6, "mongodb", event.command_name, "ok")
+
+    def failed(self, event):
+        DEPENDENCY_DURATION.observe(event.duration_micros / 1e6, "mongodb", event.command_name, "error")
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, field_validator
+from typing import Any, Optional, List, Dict, Type
 from datetime import datetime
 import uuid
 
@@ -58,6 +58,8 @@ class Appointment(BaseModel):
     appointmentDate: str
     appointmentTime: str
     timezone: str
+    startUtc: Optional[datetime] = None  # canonical UTC start - indexed for range/overlap queries
+    endUtc: Optional[datetime] = None
     status: str = 'pending_payment'  # 'pending_payment', 'scheduled', 'completed', 'cancelled', 'no-show'
     price: float
     patientInfo: PatientInfo
@@ -67,6 +69,36 @@ class Appointment(BaseModel):
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
+# Appointment read models - each maps to a Mongo projection via projection_for(),
+# so list views never read notes, intake answers or voice transcripts off disk
+class AppointmentSummary(BaseModel):
+    id: str
+    serviceId: str
+    serviceType: Optional[str] = None
+    serviceName: Optional[str] = None
+    appointmentDate: str
+    appointmentTime: str
+    timezone: str
+    startUtc: Optional[datetime] = None
+    endUtc: Optional[datetime] = None
+    status: str
+    paymentStatus: Optional[str] = None
+    price: Optional[float] = None
+    patientInfo: Optional[PatientInfo] = None
+
+class AppointmentDetail(AppointmentSummary):
+    userId: Optional[str] = None
+    notes: Optional[str] = None  # JSON string of questionnaire answers
+    paymentSessionId: Optional[str] = None
+    medicalHistory: Optional[dict] = None  # structured data from voice intake
+    medicalHistoryText: Optional[str] = None
+    createdAt: Optional[datetime] = None
+    updatedAt: Optional[datetime] = None
+
+def projection_for(model: Type[BaseModel]) -> Dict[str, int]:
+    """Mongo projection selecting exactly a read model's fields (`id` comes from `_id`)"""
+    return {name: 1 for name in model.model_fields if name != "id"}
+
 class AppointmentUpdate(BaseModel):
     status: Optional[str] = None
     date: Optional[str] = None
@@ -127,4 +159,66 @@ class Subscription(BaseModel):
 
 class SubscriptionUpdate(BaseModel):
     status: Optional[str] = None
-    planId: Optional[str] = None
\ No newline at end of file
+    planId: Optional[str] = None
+
+# Voice Intake Extraction Models
+# Schema the LLM fills in (as tool input) when extracting a transcript
+class ExtractedMedication(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    name: str
+    dosage: Optional[str] = None
+    frequency: Optional[str] = None
+
+class ExtractedWeightHistory(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    current_weight: Optional[str] = None  # lbs
+    current_height: Optional[str] = None  # inches
+    previous_attempts: List[str] = []
+    weight_loss_goals: Optional[str] = None
+
+    @field_validator("previous_attempts", mode="before")
+    @classmethod
+    def _none_as_empty(cls, value):
+        return [] if value is None else value
+
+class ExtractedMedicalData(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    medications: List[ExtractedMedication] = []
+    allergies: List[str] = []
+    chronic_conditions: List[str] = []
+    weight_history: Optional[ExtractedWeightHistory] = None
+    concerns: List[str] = []
+    additional_notes: Optional[str] = None
+
+    @field_validator("medications", "allergies", "chronic_conditions", "concerns", mode="before")
+    @classmethod
+    def _none_as_empty(cls, value):
+        return [] if value is None else value
+
+    def intake_fields(self) -> Dict[str, Any]:
+        """
+        Values for the matching ComprehensiveIntake fields (models/intake.py).
+
+        Details a transcript rarely states (allergy reaction and severity,
+        missing dosages) are filled with "Not mentioned" for the patient or
+        provider to complete.
+        """
+        return {
+            "medications": [
+                {
+                    "name": med.name,
+                    "dosage": med.dosage or "Not mentioned",
+                    "frequency": med.frequency or "Not mentioned"
+                }
+                for med in self.medications
+            ],
+            "allergies": [
+                {"allergen": allergen, "reaction": "Not mentioned", "severity": "Not mentioned"}
+                for allergen in self.allergies
+            ],
+            "pmh": [{"condition": condition} for condition in self.chronic_conditions],
+            "voice_transcript_structured": self.model_dump(exclude_none=True)
+        }
@@ -1,11 +1,23 @@
 from fastapi import APIRouter, HTTPException, status
-from datetime import datetime
-from typing import List
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from typing import List, Optional
 import logging
 
-from models import Appointment, AppointmentCreate, AppointmentUpdate, PatientInfo, Address, ConfirmationEmailRequest
+from models import (
+    Appointment, AppointmentCreate, AppointmentUpdate, PatientInfo, Address, ConfirmationEmailRequest,
+    AppointmentSummary, AppointmentDetail, projection_for
+)
 from services_data import ONE_OFF_SERVICES, get_service_info
 from services.sms_service import SMSService
+from services.slot_reservations import SlotReservationService, parse_local_slot
+from services.availability import resolve_visit_duration, has_conflict, DEFAULT_VISIT_MINUTES
+from services.slot_engine import slot_engine
+from services.appointment_times import range_query, overlap_query
+from services.appointment_history import history_pipeline, encode_cursor, MAX_PAGE_SIZE
+from crud import parse_object_id, update_by_id
+from serialization import BSONJSONResponse, streaming_json_response, with_id
+from bson import ObjectId
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +29,31 @@ from database import db
 # SMS service
 sms_service = SMSService()
 
+# Read models - list views use the summary projection, single-appointment views the detail one
+SUMMARY_PROJECTION = projection_for(AppointmentSummary)
+DETAIL_PROJECTION = projection_for(AppointmentDetail)
+# Unauthenticated calendar views (schedule, overlap) - time slots only, no patient PHI
+CALENDAR_PROJECTION = {field: 1 for field in SUMMARY_PROJECTION if field != "patientInfo"}
+
+# Slot reservations (double-booking guard)
+slot_reservations = SlotReservationService(db)
+
+def _check_service_hours(date: str, time: str, timezone: str, duration: int) -> datetime:
+    """Reject slots that fall outside provider service hours; returns the UTC start"""
+    try:
+        slot_start = parse_local_slot(date, time, timezone)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if not slot_engine.contains(slot_start, duration):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This time is outside provider service hours. Please select a different time."
+        )
+    return slot_start
+
 @router.post("/", response_model=dict)
 async def create_appointment(appointment_data: AppointmentCreate):
     """Book a new appointment - creates pending appointment requiring payment"""
@@ -29,19 +66,54 @@ async def create_appointment(appointment_data: AppointmentCreate):
             detail="Invalid service ID"
         )
     
-    # Check for already-booked time slot
-    existing = await db.appointments.find_one({
-        "appointmentDate": appointment_data.date,
-        "appointmentTime": appointment_data.time,
-        "status": {"$in": ["pending_payment", "scheduled", "completed"]}
-    })
+    duration = resolve_visit_duration(appointment_data.serviceId) or DEFAULT_VISIT_MINUTES
+    slot_start = _check_service_hours(appointment_data.date, appointment_data.time, appointment_data.timezone, duration)
+    
+    # Claim the time slot - a single insert against the unique slot index,
+    # so concurrent bookings for the same slot cannot both succeed
+    appointment_id = ObjectId()
+    reservation = await slot_reservations.reserve(
+        str(appointment_id),
+        appointment_data.date,
+        appointment_data.time,
+        appointment_data.timezone,
+        duration_minutes=duration
+    )
+    if not reservation.get("success"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=reservation.get("error", "This time slot is not available.")
+        )
     
-    if existing:
+    # The unique index only stops identical start times. Checking for overlaps
+    # after our reservation is in means two concurrent overlapping bookings
+    # cannot both miss each other.
+    slot_end = slot_start + timedelta(minutes=duration)
+    if await has_conflict(db, slot_start, slot_end, str(appointment_id)):
+        await slot_reservations.release(str(appointment_id))
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="This time slot is already booked. Please select a different time."
+            detail="This time overlaps another appointment. Please select a different time."
         )
     
+    try:
+        return await _create_reserved_appointment(
+            appointment_id, appointment_data, service, slot_start, slot_end
+        )
+    except Exception:
+        # Give the slot back if the booking could not be written
+        await slot_reservations.release(str(appointment_id))
+        raise
+
+async def _create_reserved_appointment(
+    appointment_id: ObjectId,
+    appointment_data: AppointmentCreate,
+    service: dict,
+    start_utc: datetime,
+    end_utc: datetime
+) -> dict:
+    """Create user (if new) and appointment for an already-reserved slot"""
+    
     # Check if user exists, create if new
     user = await db.users.find_one({"email": appointment_data.email})
     if not user:
@@ -75,6 +147,7 @@ async def create_appointment(appointment_data: AppointmentCreate):
     
     # Create appointment
     appointment = {
+        "_id": appointment_id,
         "userId": user_id,
         "serviceId": appointment_data.serviceId,
         "serviceType": appointment_data.serviceType,
@@ -82,6 +155,8 @@ async def create_appointment(appointment_data: AppointmentCreate):
         "appointmentDate": appointment_data.date,
         "appointmentTime": appointment_data.time,
         "timezone": appointment_data.timezone,
+        "startUtc": start_utc,
+        "endUtc": end_utc,
         "status": appointment_status,
         "price": price,
         "patientInfo": {
@@ -97,19 +172,17 @@ async def create_appointment(appointment_data: AppointmentCreate):
         "updatedAt": datetime.utcnow()
     }
     
-    result = await db.appointments.insert_one(appointment)
-    appointment["id"] = str(result.inserted_id)
-    appointment["_id"] = str(result.inserted_id)
+    await db.appointments.insert_one(appointment)
     
-    return {
+    return BSONJSONResponse({
         "success": True,
-        "appointmentId": appointment["id"],
+        "appointmentId": str(appointment_id),
         "message": "Appointment created successfully" if payment_status == 'paid' else "Please complete payment to confirm appointment",
         "requiresPayment": payment_status == 'pending',
-        "appointment": appointment
-    }
+        "appointment": with_id(appointment)
+    })
 
-@router.get("/", response_model=dict)
+@router.get("/")
 async def get_appointments_by_email(email: str):
     """Get all appointments for a user by email"""
     
@@ -118,64 +191,133 @@ async def get_appointments_by_email(email: str):
         return {"success": True, "appointments": []}
     
     user_id = str(user["_id"])
-    appointments = await db.appointments.find({"userId": user_id}).sort("appointmentDate", -1).to_list(100)
-    
-    # Convert ObjectId to string
-    for apt in appointments:
-        apt["id"] = str(apt["_id"])
-        apt["_id"] = str(apt["_id"])
+    cursor = db.appointments.find({"userId": user_id}, SUMMARY_PROJECTION).sort("startUtc", -1).limit(100)
     
-    return {
-        "success": True,
-        "appointments": appointments
-    }
+    return streaming_json_response(cursor, "appointments", head={"success": True})
 
-@router.get("/{appointment_id}", response_model=dict)
-async def get_appointment(appointment_id: str):
-    """Get single appointment details"""
+@router.get("/history")
+async def get_appointment_history(email: str, limit: int = 20, cursor: Optional[str] = None):
+    """
+    Page through a patient's appointments, newest first
+
+    Args:
+        email: Patient email
+        limit: Page size (1-100)
+        cursor: nextCursor from the previous page
+    
+    Returns:
+        Streamed JSON: {"success": true, "appointments": [...], "nextCursor": str | null}
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"limit must be between 1 and {MAX_PAGE_SIZE}"
+        )
+    try:
+        pipeline = history_pipeline(email, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    page = {"count": 0, "last": None, "more": False}
+    
+    def take(apt):
+        if page["count"] == limit:
+            # The extra document only signals that another page exists
+            page["more"] = True
+            return None
+        page["count"] += 1
+        page["last"] = apt
+        return with_id(apt)
+    
+    def next_cursor(count):
+        last = page["last"]
+        return {
+            "nextCursor": encode_cursor(last.get("startUtc"), last["_id"]) if page["more"] else None
+        }
     
-    from bson import ObjectId
+    return streaming_json_response(
+        db.users.aggregate(pipeline),
+        "appointments",
+        head={"success": True},
+        tail=next_cursor,
+        transform=take
+    )
+
+@router.get("/schedule")
+async def get_schedule(date: Optional[str] = None, timezone: str = "Pacific/Guam"):
+    """
+    Active appointments on one local day (defaults to today), in start order
+
+    Args:
+        date: Day as YYYY-MM-DD in `timezone`
+        timezone: IANA timezone the day is taken in
+    """
     try:
-        appointment = await db.appointments.find_one({"_id": ObjectId(appointment_id)})
+        tz = ZoneInfo(timezone)
+        day = datetime.strptime(date, "%Y-%m-%d").date() if date else datetime.now(tz).date()
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid appointment ID"
+            detail="Invalid date or timezone"
         )
     
-    if not appointment:
+    day_start = datetime(day.year, day.month, day.day, tzinfo=tz)
+    day_end = day_start + timedelta(days=1)
+    cursor = db.appointments.find(range_query(day_start, day_end), CALENDAR_PROJECTION).sort("startUtc", 1).limit(500)
+    
+    return streaming_json_response(
+        cursor,
+        "appointments",
+        head={"success": True, "date": day.isoformat(), "timezone": timezone}
+    )
+
+@router.get("/overlapping")
+async def get_overlapping_appointments(start: datetime, end: datetime):
+    """Active appointments overlapping [start, end) (ISO datetimes, UTC if no offset)"""
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=ZoneInfo("UTC"))
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=ZoneInfo("UTC"))
+    if end <= start:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Appointment not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be after start"
         )
     
-    appointment["id"] = str(appointment["_id"])
-    appointment["_id"] = str(appointment["_id"])
+    cursor = db.appointments.find(overlap_query(start, end), CALENDAR_PROJECTION).sort("startUtc", 1).limit(500)
     
-    return {
-        "success": True,
-        "appointment": appointment
-    }
+    return streaming_json_response(cursor, "appointments", head={"success": True})
 
-@router.patch("/{appointment_id}", response_model=dict)
-async def update_appointment(appointment_id: str, update_data: AppointmentUpdate):
-    """Update appointment (reschedule, cancel, etc.)"""
+@router.get("/{appointment_id}", response_model=dict)
+async def get_appointment(appointment_id: str):
+    """Get single appointment details"""
     
-    from bson import ObjectId
     try:
-        existing = await db.appointments.find_one({"_id": ObjectId(appointment_id)})
+        appointment = await db.appointments.find_one({"_id": ObjectId(appointment_id)}, DETAIL_PROJECTION)
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid appointment ID"
         )
     
-    if not existing:
+    if not appointment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Appointment not found"
         )
     
+    return BSONJSONResponse({
+        "success": True,
+        "appointment": with_id(appointment)
+    })
+
+@router.patch("/{appointment_id}", response_model=dict)
+async def update_appointment(appointment_id: str, update_data: AppointmentUpdate):
+    """Update appointment (reschedule, cancel, etc.)"""
+    
     # Build update dict
     update_dict = {}
     if update_data.status:
@@ -188,30 +330,73 @@ async def update_appointment(appointment_id: str, update_data: AppointmentUpdate
         update_dict["notes"] = update_data.notes
     if update_data.paymentStatus:
         update_dict["paymentStatus"] = update_data.paymentStatus
+    if update_data.paymentSessionId:
+        update_dict["paymentSessionId"] = update_data.paymentSessionId
     
     update_dict["updatedAt"] = datetime.utcnow()
     
-    await db.appointments.update_one(
-        {"_id": ObjectId(appointment_id)},
-        {"$set": update_dict}
+    # A reschedule must claim the new slot before the appointment moves,
+    # which needs the current slot; every other update is a single write
+    if (update_data.date or update_data.time) and update_data.status != "cancelled":
+        await _move_reservation(appointment_id, update_data, update_dict)
+    
+    updated = await update_by_id(
+        db.appointments, appointment_id, update_dict, "appointment", projection=DETAIL_PROJECTION
     )
     
-    updated = await db.appointments.find_one({"_id": ObjectId(appointment_id)})
-    updated["id"] = str(updated["_id"])
-    updated["_id"] = str(updated["_id"])
+    if update_data.status == "cancelled":
+        await slot_reservations.release(appointment_id)
+    elif update_data.status and update_data.status != "pending_payment":
+        # Paid/scheduled bookings keep their slot - drop the hold expiry
+        await slot_reservations.confirm(appointment_id, updated)
     
-    return {
+    return BSONJSONResponse({
         "success": True,
         "message": "Appointment updated successfully",
         "appointment": updated
-    }
+    })
+
+async def _move_reservation(appointment_id: str, update_data: AppointmentUpdate, update_dict: dict):
+    """Reserve the new slot for a reschedule and add its UTC times to update_dict"""
+    existing = await db.appointments.find_one(
+        {"_id": parse_object_id(appointment_id, "appointment")},
+        {"appointmentDate": 1, "appointmentTime": 1, "timezone": 1, "serviceId": 1, "status": 1}
+    )
+    if not existing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Appointment not found"
+        )
+    
+    new_date = update_data.date or existing.get("appointmentDate")
+    new_time = update_data.time or existing.get("appointmentTime")
+    new_status = update_data.status or existing.get("status")
+    if new_status == "cancelled" or (new_date, new_time) == (existing.get("appointmentDate"), existing.get("appointmentTime")):
+        return
+    
+    duration = resolve_visit_duration(existing.get("serviceId")) or DEFAULT_VISIT_MINUTES
+    slot_start = _check_service_hours(new_date, new_time, existing.get("timezone"), duration)
+    update_dict["startUtc"] = slot_start
+    update_dict["endUtc"] = slot_start + timedelta(minutes=duration)
+    reservation = await slot_reservations.reschedule(
+        appointment_id,
+        new_date,
+        new_time,
+        existing.get("timezone"),
+        confirmed=new_status != "pending_payment",
+        duration_minutes=duration,
+        conflict_check=lambda: has_conflict(db, slot_start, update_dict["endUtc"], appointment_id)
+    )
+    if not reservation.get("success"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=reservation.get("error", "This time slot is not available.")
+        )
 
 @router.post("/send-confirmation")
 async def send_confirmation_email(request: ConfirmationEmailRequest):
     """Send appointment confirmation email with receipt"""
     try:
-        from bson import ObjectId
-        
         # Get appointment details
         appointment = await db.appointments.find_one({"_id": ObjectId(request.appointmentId)})
         if not appointment:
@@ -2,18 +2,21 @@ from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi.responses import RedirectResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
+from zoneinfo import ZoneInfo
 from services.drchrono_service import DrChronoService
+from services.calendar_availability import CalendarAvailabilityService
+from services.availability import find_open_slots, resolve_visit_duration
+from config import SUPPORTED_REGIONS, MAX_AVAILABILITY_RANGE_DAYS
 from database import db
 import logging
-import requests
-import os
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/drchrono", tags=["drchrono"])
 
 drchrono = DrChronoService()
+calendar_index = CalendarAvailabilityService()
 
 class CreatePatientRequest(BaseModel):
     access_token: str
@@ -41,6 +44,13 @@ class CheckAvailabilityRequest(BaseModel):
     timezone: str
     duration: int = 15
 
+class AvailableSlotsRequest(BaseModel):
+    start_date: str  # YYYY-MM-DD, region-local
+    end_date: str  # YYYY-MM-DD, region-local, inclusive
+    region: str  # SUPPORTED_REGIONS key: GU, HI, CA
+    service: Optional[str] = None  # service line, visit type or service ID
+    duration: Optional[int] = None  # minutes; overrides the service duration
+
 @router.get("/auth/authorize")
 async def authorize_drchrono(state: Optional[str] = None):
     """
@@ -91,12 +101,10 @@ async def drchrono_callback(
 async def check_availability(request: CheckAvailabilityRequest):
     """
     Check if provider is available at requested time
-    Uses DrChrono calendar ICS feed
+    Uses the in-memory index of the DrChrono calendar ICS feed
     """
     try:
-        calendar_link = os.getenv("DRCHRONO_CALENDAR_LINK")
-        
-        if not calendar_link or "placeholder" in calendar_link:
+        if not calendar_index.enabled:
             # Graceful degradation - assume available if no calendar configured
             return {
                 "available": True,
@@ -104,46 +112,19 @@ async def check_availability(request: CheckAvailabilityRequest):
                 "note": "Calendar check skipped - not configured"
             }
         
-        # Fetch ICS calendar
-        response = requests.get(calendar_link, timeout=5)
-        
-        if response.status_code != 200:
-            logger.warning(f"Failed to fetch DrChrono calendar: {response.status_code}")
+        if not calendar_index.ready:
             return {
                 "available": True,
                 "conflicts": [],
-                "note": "Calendar check failed - assuming available"
+                "note": "Calendar not loaded yet - assuming available"
             }
         
-        # Parse ICS for conflicts
-        # Simple check: look for DTSTART entries that overlap
-        ics_content = response.text
         requested_time = datetime.fromisoformat(request.datetime.replace('Z', '+00:00'))
+        if requested_time.tzinfo is None:
+            requested_time = requested_time.replace(tzinfo=ZoneInfo(request.timezone))
         appointment_end = requested_time + timedelta(minutes=request.duration)
         
-        conflicts = []
-        
-        # Basic ICS parsing (simplified)
-        lines = ics_content.split('\n')
-        for i, line in enumerate(lines):
-            if line.startswith('DTSTART'):
-                # Extract datetime from ICS format
-                dt_str = line.split(':')[1].strip()
-                try:
-                    # Handle YYYYMMDDTHHMMSS format
-                    if 'T' in dt_str:
-                        event_start = datetime.strptime(dt_str[:15], '%Y%m%dT%H%M%S')
-                        # Check if there's overlap
-                        event_end = event_start + timedelta(minutes=15)  # 15 min appointments
-                        
-                        if (event_start < appointment_end and event_end > requested_time):
-                            conflicts.append({
-                                'start': event_start.isoformat(),
-                                'end': event_end.isoformat()
-                            })
-                except Exception as parse_error:
-                    logger.debug(f"Could not parse ICS date: {dt_str}")
-                    continue
+        conflicts = calendar_index.find_conflicts(requested_time, appointment_end)
         
         return {
             "available": len(conflicts) == 0,
@@ -160,6 +141,47 @@ async def check_availability(request: CheckAvailabilityRequest):
         }
 
 
+@router.post("/available-slots")
+async def get_available_slots(request: AvailableSlotsRequest):
+    """
+    Return every open slot for a date range in one call
+    Merges DrChrono calendar busy blocks with booked MedRx slots
+    """
+    if request.region not in SUPPORTED_REGIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported region: {request.region}")
+    
+    duration = request.duration or resolve_visit_duration(request.service)
+    if not duration or duration <= 0:
+        raise HTTPException(status_code=400, detail="Unknown service - provide a service or duration")
+    
+    try:
+        start_date = date.fromisoformat(request.start_date)
+        end_date = date.fromisoformat(request.end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (end_date - start_date).days >= MAX_AVAILABILITY_RANGE_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Date range cannot exceed {MAX_AVAILABILITY_RANGE_DAYS} days"
+        )
+    
+    try:
+        result = await find_open_slots(db, calendar_index, start_date, end_date, request.region, duration)
+    except Exception as e:
+        logger.error(f"Available slots error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return {
+        "success": True,
+        "region": request.region,
+        "duration": duration,
+        **result
+    }
+
+
 @router.post("/auth/refresh")
 async def refresh_token(request: RefreshTokenRequest):
     """
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime
 from typing import Optional
 import os
@@ -7,6 +8,7 @@ import logging
 
 from services.photo_upload import PhotoUploadService
 from database import db
+from serialization import streaming_json_response
 
 logger = logging.getLogger(__name__)
 
@@ -218,8 +220,25 @@ async def submit_consents(
 async def get_patient_photos(patient_id: str, appointment_id: Optional[str] = None):
     """Get all photos for a patient"""
     try:
-        result = await photo_service.get_patient_photos(patient_id)
-        return result
+        # Once streaming starts the status is sent, so surface unreadable
+        # directories as an error response first
+        await run_in_threadpool(photo_service.check_photo_dirs)
+    except Exception as e:
+        logger.error(f"Failed to retrieve photos: {str(e)}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+    
+    try:
+        # Streamed as the directories are walked; the count follows the list
+        return streaming_json_response(
+            photo_service.iter_patient_photos(patient_id),
+            "photos",
+            head={"success": True, "patient_id": patient_id},
+            tail=lambda count: {"photo_count": count},
+            transform=None
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
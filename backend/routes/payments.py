@@ -1,25 +1,34 @@
 from fastapi import APIRouter, HTTPException, status, Request
-from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime
 from typing import Optional
-import os
 import json
 import logging
 
-from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
+from emergentintegrations.payments.stripe.checkout import CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
 from models import PaymentTransaction, CheckoutSessionCreate
 from services_data import ONE_OFF_SERVICES
-from services.sms_service import SMSService
+from services.notifications import NotificationService
+from services.payment_gateway import PaymentGateway
+from services.checkout_status import CheckoutStatusCache
+from services.payment_events import PaymentEventProcessor
+from metrics import REGISTRY, track_dependency, gauge_lines
+from services.slot_reservations import SlotReservationService
 
 router = APIRouter(prefix="/api/payments", tags=["payments"])
 logger = logging.getLogger(__name__)
 
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection
+from database import db
 
-STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY', 'sk_test_emergent')
-sms_service = SMSService()
+payment_gateway = PaymentGateway()
+notifications = NotificationService(db)
+slot_reservations = SlotReservationService(db)
+checkout_status_cache = CheckoutStatusCache(db)
+payment_events = PaymentEventProcessor(db, slot_reservations, notifications, checkout_status_cache)
+
+REGISTRY.register_collector(lambda: gauge_lines(
+    "checkout_status_cache", "Checkout status read path counter", checkout_status_cache.stats()
+))
 
 # Service pricing - Updated for current services
 SERVICE_PACKAGES = {
@@ -69,9 +78,7 @@ async def create_checkout_session(data: CheckoutSessionCreate, request: Request)
         success_url = f"{origin_url}/booking-success?session_id={{CHECKOUT_SESSION_ID}}"
         cancel_url = f"{origin_url}/#booking"
         
-        host_url = str(request.base_url).rstrip('/')
-        webhook_url = f"{host_url}/api/webhook/stripe"
-        stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+        stripe_checkout = payment_gateway.checkout(str(request.base_url))
         
         metadata = {
             'service_id': service_id,
@@ -89,7 +96,8 @@ async def create_checkout_session(data: CheckoutSessionCreate, request: Request)
             metadata=metadata
         )
         
-        session = await stripe_checkout.create_checkout_session(checkout_request)
+        async with track_dependency("stripe", "create_checkout_session"):
+            session = await stripe_checkout.create_checkout_session(checkout_request)
         
         payment_transaction = {
             'sessionId': session.session_id,
@@ -100,7 +108,8 @@ async def create_checkout_session(data: CheckoutSessionCreate, request: Request)
             'currency': 'usd',
             'status': 'initiated',
             'paymentStatus': 'unpaid',
-            'appointmentId': None,
+            # Booking.jsx creates the appointment first; the webhook pipeline schedules it by this id
+            'appointmentId': appointment_data.get('appointmentId'),
             'metadata': metadata,
             'createdAt': datetime.utcnow(),
             'updatedAt': datetime.utcnow()
@@ -123,68 +132,43 @@ async def create_checkout_session(data: CheckoutSessionCreate, request: Request)
             detail=f"Checkout error: {str(e)}"
         )
 
+async def _refresh_checkout_status(payment: dict, base_url: str) -> dict:
+    """Ask Stripe for an open session's status; changes are applied by the event processor"""
+    session_id = payment['sessionId']
+    stripe_checkout = payment_gateway.checkout(base_url)
+    async with track_dependency("stripe", "get_checkout_status"):
+        checkout_status = await stripe_checkout.get_checkout_status(session_id)
+    
+    if payment['paymentStatus'] != checkout_status.payment_status:
+        await payment_events.submit_status(session_id, checkout_status.status, checkout_status.payment_status)
+    
+    return {
+        'status': checkout_status.status,
+        'paymentStatus': checkout_status.payment_status,
+        'amount': checkout_status.amount_total / 100,
+        'currency': checkout_status.currency,
+        'metadata': checkout_status.metadata
+    }
+
 @router.get("/checkout/status/{session_id}")
 async def get_checkout_status(session_id: str, request: Request):
     try:
-        host_url = str(request.base_url).rstrip('/')
-        webhook_url = f"{host_url}/api/webhook/stripe"
-        stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
-        
-        checkout_status = await stripe_checkout.get_checkout_status(session_id)
-        
-        payment = await db.payment_transactions.find_one({'sessionId': session_id})
+        base_url = str(request.base_url)
+        # Final sessions are answered locally; open ones go to Stripe, rate limited per session
+        snapshot = await checkout_status_cache.get(
+            session_id,
+            lambda payment: _refresh_checkout_status(payment, base_url)
+        )
         
-        if not payment:
+        if snapshot is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Payment not found"
             )
         
-        if payment['paymentStatus'] != checkout_status.payment_status:
-            update_data = {
-                'status': checkout_status.status,
-                'paymentStatus': checkout_status.payment_status,
-                'updatedAt': datetime.utcnow()
-            }
-            
-            await db.payment_transactions.update_one(
-                {'sessionId': session_id},
-                {'$set': update_data}
-            )
-            
-            if checkout_status.payment_status == 'paid' and payment.get('appointmentId'):
-                # Update appointment status
-                await db.appointments.update_one(
-                    {'_id': payment['appointmentId']},
-                    {'$set': {
-                        'paymentStatus': 'paid',
-                        'status': 'scheduled',
-                        'updatedAt': datetime.utcnow()
-                    }}
-                )
-                
-                # Send SMS notification
-                appointment = await db.appointments.find_one({'_id': payment['appointmentId']})
-                if appointment:
-                    try:
-                        await sms_service.send_booking_alert({
-                            'patientInfo': appointment.get('patientInfo', {}),
-                            'serviceName': appointment.get('serviceName', 'Unknown Service'),
-                            'date': appointment.get('appointmentDate', 'N/A'),
-                            'time': appointment.get('appointmentTime', 'N/A'),
-                            'timezone': appointment.get('timezone', 'N/A')
-                        })
-                    except Exception as sms_error:
-                        # Log but don't fail the payment
-                        print(f"SMS notification failed: {sms_error}")
-        
         return {
             'success': True,
-            'status': checkout_status.status,
-            'paymentStatus': checkout_status.payment_status,
-            'amount': checkout_status.amount_total / 100,
-            'currency': checkout_status.currency,
-            'metadata': checkout_status.metadata
+            **snapshot
         }
         
     except HTTPException:
@@ -195,6 +179,14 @@ async def get_checkout_status(session_id: str, request: Request):
             detail=f"Status check error: {str(e)}"
         )
 
+@router.get("/checkout/status-cache")
+async def get_checkout_status_cache_stats():
+    """Hit/miss counters for the checkout status read path"""
+    return {
+        'success': True,
+        'stats': checkout_status_cache.stats()
+    }
+
 @router.post("/webhook/stripe")
 async def stripe_webhook(request: Request):
     try:
@@ -207,23 +199,15 @@ async def stripe_webhook(request: Request):
                 detail="Missing signature"
             )
         
-        host_url = str(request.base_url).rstrip('/')
-        webhook_url = f"{host_url}/api/webhook/stripe"
-        stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
-        
-        webhook_response = await stripe_checkout.handle_webhook(body, signature)
-        
-        if webhook_response.session_id:
-            update_data = {
-                'status': webhook_response.event_type,
-                'paymentStatus': webhook_response.payment_status,
-                'updatedAt': datetime.utcnow()
-            }
-            
-            await db.payment_transactions.update_one(
-                {'sessionId': webhook_response.session_id},
-                {'$set': update_data}
-            )
+        stripe_checkout = payment_gateway.checkout(str(request.base_url))
+        
+        async with track_dependency("stripe", "handle_webhook"):
+            webhook_response = await stripe_checkout.handle_webhook(body, signature)
+        
+        # Record once and ack; the transitions run on the payment event queue
+        result = await payment_events.record_webhook(webhook_response)
+        if result.get("duplicate"):
+            return {'success': True, 'received': True, 'duplicate': True}
         
         return {'success': True, 'received': True}
         
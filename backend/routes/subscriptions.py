@@ -3,6 +3,8 @@ from datetime import datetime, timedelta
 from typing import List
 
 from models import Subscription, SubscriptionCreate, SubscriptionUpdate
+from crud import update_by_id
+from serialization import BSONJSONResponse, with_id
 # SUBSCRIPTION_PLANS = {}  # No subscriptions - all MedRx services are one-off consultations
 SUBSCRIPTION_PLANS = {}
 
@@ -65,9 +67,8 @@ async def create_subscription(subscription_data: SubscriptionCreate):
         "updatedAt": now
     }
     
-    result = await db.subscriptions.insert_one(subscription)
-    subscription["id"] = str(result.inserted_id)
-    subscription["_id"] = str(result.inserted_id)
+    await db.subscriptions.insert_one(subscription)
+    with_id(subscription)
     
     # Update user's subscriptionId
     from bson import ObjectId
@@ -76,12 +77,12 @@ async def create_subscription(subscription_data: SubscriptionCreate):
         {"$set": {"subscriptionId": subscription["id"], "updatedAt": now}}
     )
     
-    return {
+    return BSONJSONResponse({
         "success": True,
         "subscriptionId": subscription["id"],
         "message": "Subscription created successfully!",
         "subscription": subscription
-    }
+    })
 
 @router.get("/user/{user_id}", response_model=dict)
 async def get_user_subscription(user_id: str):
@@ -99,13 +100,10 @@ async def get_user_subscription(user_id: str):
             "message": "No active subscription found"
         }
     
-    subscription["id"] = str(subscription["_id"])
-    subscription["_id"] = str(subscription["_id"])
-    
-    return {
+    return BSONJSONResponse({
         "success": True,
-        "subscription": subscription
-    }
+        "subscription": with_id(subscription)
+    })
 
 @router.get("/email/{email}", response_model=dict)
 async def get_subscription_by_email(email: str):
@@ -132,33 +130,15 @@ async def get_subscription_by_email(email: str):
             "message": "No active subscription found"
         }
     
-    subscription["id"] = str(subscription["_id"])
-    subscription["_id"] = str(subscription["_id"])
-    
-    return {
+    return BSONJSONResponse({
         "success": True,
-        "subscription": subscription
-    }
+        "subscription": with_id(subscription)
+    })
 
 @router.patch("/{subscription_id}", response_model=dict)
 async def update_subscription(subscription_id: str, update_data: SubscriptionUpdate):
     """Update subscription (upgrade, downgrade, cancel)"""
     
-    from bson import ObjectId
-    try:
-        existing = await db.subscriptions.find_one({"_id": ObjectId(subscription_id)})
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid subscription ID"
-        )
-    
-    if not existing:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Subscription not found"
-        )
-    
     update_dict = {"updatedAt": datetime.utcnow()}
     
     # Handle status change
@@ -183,20 +163,13 @@ async def update_subscription(subscription_id: str, update_data: SubscriptionUpd
         # Reset appointment counter on plan change
         update_dict["appointmentsThisMonth"] = 0
     
-    await db.subscriptions.update_one(
-        {"_id": ObjectId(subscription_id)},
-        {"$set": update_dict}
-    )
-    
-    updated = await db.subscriptions.find_one({"_id": ObjectId(subscription_id)})
-    updated["id"] = str(updated["_id"])
-    updated["_id"] = str(updated["_id"])
+    updated = await update_by_id(db.subscriptions, subscription_id, update_dict, "subscription")
     
-    return {
+    return BSONJSONResponse({
         "success": True,
         "message": "Subscription updated successfully",
         "subscription": updated
-    }
+    })
 
 @router.get("/{subscription_id}/usage", response_model=dict)
 async def get_subscription_usage(subscription_id: str):
@@ -1,18 +1,29 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Query, status
 from pydantic import BaseModel
 import os
 import json
 import asyncio
-from services.voice_intake import VoiceIntakeService
+from services.voice_intake import VoiceIntakeService, intake_fields
+from services.transcript_jobs import TranscriptJobService, store_medical_history
+from services.extraction_cache import ExtractionCache
+from metrics import REGISTRY, gauge_lines
 from database import db
-from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/voice-intake", tags=["voice-intake"])
 
-voice_service = VoiceIntakeService()
+extraction_cache = ExtractionCache(db)
+voice_service = VoiceIntakeService(extraction_cache)
+transcript_jobs = TranscriptJobService(db, voice_service)
+
+REGISTRY.register_collector(lambda: gauge_lines(
+    "extraction_cache", "Transcript extraction cache counter", extraction_cache.stats()
+))
+
+# Longest a status request may be held open waiting for a job to finish
+MAX_JOB_WAIT_SECONDS = 30
 
 class ProcessTranscriptRequest(BaseModel):
     transcript: str
@@ -93,6 +104,8 @@ async def process_transcript(request: ProcessTranscriptRequest):
         # Extract medical data using Claude Sonnet-4
         medical_data = await voice_service.extract_medical_data(request.transcript)
         
+        if medical_data.get("busy"):
+            raise HTTPException(status_code=503, detail=medical_data.get("error"))
         if not medical_data.get("success"):
             raise HTTPException(status_code=500, detail=medical_data.get("error"))
         
@@ -102,25 +115,16 @@ async def process_transcript(request: ProcessTranscriptRequest):
         # Store in database if appointment_id provided
         if request.appointment_id:
             # Update appointment with medical history
-            result = await db.appointments.update_one(
-                {"id": request.appointment_id},
-                {
-                    "$set": {
-                        "medicalHistory": medical_data.get("data"),
-                        "medicalHistoryText": formatted_notes,
-                        "voiceTranscript": request.transcript,
-                        "updatedAt": datetime.now().isoformat()
-                    }
-                }
+            await store_medical_history(
+                db, request.appointment_id, request.transcript, medical_data, formatted_notes
             )
-            
-            if result.modified_count == 0:
-                logger.warning(f"Appointment {request.appointment_id} not found or not updated")
         
         return {
             "success": True,
             "medical_data": medical_data.get("data"),
-            "formatted_notes": formatted_notes
+            "formatted_notes": formatted_notes,
+            "intake_fields": intake_fields(medical_data.get("data")),
+            "cached": medical_data.get("cached", False)
         }
         
     except HTTPException:
@@ -130,6 +134,42 @@ async def process_transcript(request: ProcessTranscriptRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_transcript_job(request: ProcessTranscriptRequest):
+    """
+    Queue a transcript for background extraction and return its job id.
+    
+    The result is written to the appointment (when appointment_id is given)
+    and is available from GET /jobs/{job_id}.
+    """
+    result = await transcript_jobs.submit(request.transcript, request.appointment_id)
+    if not result.get("success"):
+        raise HTTPException(status_code=500, detail=result.get("error"))
+    
+    return {
+        "success": True,
+        "job_id": result["job_id"],
+        "status": "pending"
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def get_transcript_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=MAX_JOB_WAIT_SECONDS, description="Seconds to wait for the job to finish")
+):
+    """
+    Status of a transcript job; medical_data and formatted_notes are set once it is done.
+    
+    With `wait`, the request is held open until the job finishes or the wait runs out.
+    """
+    job = await transcript_jobs.status(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Transcript job not found")
+    
+    return {"success": True, **job}
+
+
 @router.get("/health")
 async def health_check():
     """Check if voice intake service is properly configured"""
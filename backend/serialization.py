@@ -0,0 +1,117 @@
+import orjson
+from bson import ObjectId, Decimal128
+from typing import Any, AsyncIterable, Callable, Dict, Iterable, Optional, Union
+from starlette.concurrency import iterate_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Flush streamed output once this many bytes are buffered
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def bson_default(value: Any) -> Any:
+    """orjson fallback for BSON types (datetime, UUID and dataclasses are native)"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize to JSON bytes, handling ObjectId and datetime"""
+    # Mongo returns naive UTC datetimes; emit them with their +00:00 offset
+    return orjson.dumps(value, default=bson_default, option=orjson.OPT_NAIVE_UTC)
+
+
+class BSONJSONResponse(JSONResponse):
+    """
+    orjson-rendered JSON response that understands ObjectId and datetime.
+
+    Set as the app's default response class. Routes that return Mongo
+    documents return an instance directly, which skips FastAPI's
+    jsonable_encoder pass and any manual str(_id) conversion.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def with_id(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the string `id` the API exposes next to `_id`"""
+    if "_id" in document:
+        document["id"] = str(document["_id"])
+    return document
+
+
+async def _aiter(items: Union[AsyncIterable, Iterable]):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        # Blocking iterables (file system walks) run off the event loop
+        async for item in iterate_in_threadpool(iter(items)):
+            yield item
+
+
+async def stream_json_list(
+    items: Union[AsyncIterable, Iterable],
+    key: str,
+    head: Optional[Dict[str, Any]] = None,
+    tail: Optional[Callable[[int], Dict[str, Any]]] = None,
+    transform: Optional[Callable[[Any], Any]] = None
+):
+    """
+    Encode {**head, key: [items...], **tail(count)} incrementally.
+
+    Items (a Motor cursor or any iterable) are encoded one at a time and
+    written in chunks of about STREAM_CHUNK_BYTES, so memory stays bounded
+    by the chunk size rather than the result size.
+
+    Args:
+        items: Documents to emit
+        key: Name of the list field
+        head: Fields written before the list
+        tail: Called with the item count after the list; returns trailing fields
+        transform: Applied to each item before encoding; returning None skips it
+    """
+    head_bytes = dumps(head or {})
+    prefix = head_bytes[:-1] + (b"," if len(head_bytes) > 2 else b"")
+    buffer = bytearray(prefix + dumps(key) + b":[")
+
+    count = 0
+    async for item in _aiter(items):
+        if transform is not None:
+            item = transform(item)
+            if item is None:
+                continue
+        if count:
+            buffer += b","
+        buffer += dumps(item)
+        count += 1
+        if len(buffer) >= STREAM_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+
+    buffer += b"]"
+    trailer = tail(count) if tail is not None else {}
+    if trailer:
+        buffer += b"," + dumps(trailer)[1:]
+    else:
+        buffer += b"}"
+    yield bytes(buffer)
+
+
+def streaming_json_response(
+    items: Union[AsyncIterable, Iterable],
+    key: str,
+    head: Optional[Dict[str, Any]] = None,
+    tail: Optional[Callable[[int], Dict[str, Any]]] = None,
+    transform: Optional[Callable[[Any], Any]] = with_id,
+    status_code: int = 200
+) -> StreamingResponse:
+    """StreamingResponse for stream_json_list; adds string ids to documents by default"""
+    return StreamingResponse(
+        stream_json_list(items, key, head=head, tail=tail, transform=transform),
+        status_code=status_code,
+        media_type="application/json"
+    )
@@ -1,8 +1,9 @@
 from fastapi import FastAPI, APIRouter
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
 
@@ -13,10 +14,14 @@ ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # Import database connection
-from database import db, client
+from database import db, client, ensure_indexes
+from serialization import BSONJSONResponse
+from metrics import MetricsMiddleware, REGISTRY
+from services.appointment_times import backfill_appointment_times
+from services.slot_reservations import backfill_slot_reservations
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=BSONJSONResponse)
 
 # Add CORS middleware FIRST (before routers)
 app.add_middleware(
@@ -27,6 +32,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -39,6 +47,11 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "MedRx Telemedicine API"}
 
+@api_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (per-worker values)"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 # Include routers (they already have /api prefix in their router definitions)
 app.include_router(appointments.router)
 app.include_router(subscriptions.router)
@@ -57,6 +70,59 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_db_indexes():
+    # Fail startup rather than serve requests against unindexed collections
+    await ensure_indexes(db)
+
+@app.on_event("startup")
+async def startup_appointment_backfill():
+    # Existing appointments get startUtc/endUtc in the background; new ones are written with them.
+    # Upcoming ones then get slot reservations so the unique slot guard sees them.
+    async def backfill():
+        try:
+            await backfill_appointment_times(db)
+            await backfill_slot_reservations(db, appointments.slot_reservations)
+        except Exception as e:
+            logger.error(f"Appointment backfill failed: {e}")
+    app.state.appointment_backfill = asyncio.create_task(backfill())
+
+@app.on_event("startup")
+async def startup_calendar_index():
+    await drchrono.calendar_index.start()
+
+@app.on_event("startup")
+async def startup_payment_gateway():
+    await payments.payment_gateway.start()
+
+@app.on_event("startup")
+async def startup_notification_workers():
+    await payments.notifications.start()
+    await payments.payment_events.start()
+
+@app.on_event("shutdown")
+async def shutdown_notification_workers():
+    await payments.payment_events.stop()
+    await payments.notifications.stop()
+
+@app.on_event("startup")
+async def startup_transcript_workers():
+    await voice_intake.transcript_jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown_transcript_workers():
+    await voice_intake.transcript_jobs.stop()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    backfill = getattr(app.state, "appointment_backfill", None)
+    if backfill and not backfill.done():
+        backfill.cancel()
+    client.close()
+
+@app.on_event("shutdown")
+async def shutdown_http_clients():
+    await drchrono.calendar_index.stop()
+    await drchrono.drchrono.close()
+    await payments.payment_gateway.stop()
+    await voice_intake.voice_service.close()
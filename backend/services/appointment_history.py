@@ -0,0 +1,88 @@
+import base64
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+
+from models import AppointmentSummary, projection_for
+
+# Fields the patient dashboard shows for a past or upcoming visit
+HISTORY_FIELDS = projection_for(AppointmentSummary)
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(start_utc: Optional[datetime], appointment_id: ObjectId) -> str:
+    """Opaque keyset cursor for the position after (start_utc, _id)"""
+    start_ms = "" if start_utc is None else str(int(start_utc.replace(tzinfo=timezone.utc).timestamp() * 1000))
+    return base64.urlsafe_b64encode(f"{start_ms}:{appointment_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], ObjectId]:
+    """
+    Inverse of encode_cursor
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        start_ms, appointment_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        start_utc = datetime.fromtimestamp(int(start_ms) / 1000, tz=timezone.utc) if start_ms else None
+        return start_utc, ObjectId(appointment_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _after_cursor(start_utc: Optional[datetime], appointment_id: ObjectId) -> Dict[str, Any]:
+    """
+    $expr selecting appointments after the cursor in (startUtc desc, _id desc) order.
+
+    Aggregation comparisons use BSON order, where null/missing sort below
+    every date, so appointments the backfill could not normalize come last.
+    """
+    if start_utc is None:
+        return {"$and": [
+            {"$lte": ["$startUtc", None]},
+            {"$lt": ["$_id", appointment_id]}
+        ]}
+    return {"$or": [
+        {"$lt": ["$startUtc", start_utc]},
+        {"$and": [
+            {"$eq": ["$startUtc", start_utc]},
+            {"$lt": ["$_id", appointment_id]}
+        ]}
+    ]}
+
+
+def history_pipeline(email: str, limit: int, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Aggregation over users returning one page of a patient's appointments.
+
+    The user is matched by email and joined to appointments on its string
+    id, newest first. One more document than `limit` is returned so the
+    caller can tell whether another page exists.
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    match: Dict[str, Any] = {"$eq": ["$userId", "$$userId"]}
+    if cursor:
+        match = {"$and": [match, _after_cursor(*decode_cursor(cursor))]}
+
+    return [
+        {"$match": {"email": email}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "userId": {"$toString": "$_id"}}},
+        {"$lookup": {
+            "from": "appointments",
+            "let": {"userId": "$userId"},
+            "pipeline": [
+                {"$match": {"$expr": match}},
+                {"$sort": {"startUtc": -1, "_id": -1}},
+                {"$limit": limit + 1},
+                {"$project": HISTORY_FIELDS}
+            ],
+            "as": "appointments"
+        }},
+        {"$unwind": "$appointments"},
+        {"$replaceRoot": {"newRoot": "$appointments"}}
+    ]
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+from pymongo import UpdateOne
+import logging
+
+from config import VISIT_DURATIONS
+from services.slot_reservations import parse_local_slot
+from services.availability import resolve_visit_duration, DEFAULT_VISIT_MINUTES
+
+logger = logging.getLogger(__name__)
+
+# Longest visit; bounds the startUtc range scanned by overlap queries
+MAX_VISIT_MINUTES = max(max(VISIT_DURATIONS.values()), DEFAULT_VISIT_MINUTES)
+
+# Statuses that occupy the provider's time
+ACTIVE_STATUSES = ["pending_payment", "scheduled", "completed"]
+
+
+def appointment_time_fields(date: str, time: str, timezone: str, service_id: Optional[str]) -> Dict[str, datetime]:
+    """
+    Canonical UTC start/end for an appointment's display date/time
+
+    Raises:
+        ValueError: if the date, time or timezone cannot be parsed
+    """
+    start = parse_local_slot(date, time, timezone)
+    duration = resolve_visit_duration(service_id) or DEFAULT_VISIT_MINUTES
+    return {
+        "startUtc": start,
+        "endUtc": start + timedelta(minutes=duration)
+    }
+
+
+def range_query(start: datetime, end: datetime, statuses=None) -> Dict[str, Any]:
+    """Appointments starting in [start, end) - a single scan of the startUtc index"""
+    return {
+        "startUtc": {"$gte": start, "$lt": end},
+        "status": {"$in": statuses or ACTIVE_STATUSES}
+    }
+
+
+def overlap_query(start: datetime, end: datetime, statuses=None) -> Dict[str, Any]:
+    """
+    Appointments overlapping [start, end).
+
+    Bounding startUtc from below by the longest visit keeps this a bounded
+    range scan on the startUtc index instead of an open-ended one.
+    """
+    return {
+        "startUtc": {"$lt": end, "$gt": start - timedelta(minutes=MAX_VISIT_MINUTES)},
+        "endUtc": {"$gt": start},
+        "status": {"$in": statuses or ACTIVE_STATUSES}
+    }
+
+
+async def backfill_appointment_times(database, batch_size: int = 500, pause_seconds: float = 0.1) -> int:
+    """
+    Add startUtc/endUtc to appointments created before they existed.
+
+    Runs in batches with a short pause between them so it can run in the
+    background on a live server. Documents whose date/time cannot be parsed
+    get startUtc=None so they are not picked up again.
+
+    Returns:
+        Number of appointments updated
+    """
+    updated = 0
+    while True:
+        batch = await database.appointments.find(
+            {"startUtc": {"$exists": False}},
+            {"appointmentDate": 1, "appointmentTime": 1, "timezone": 1, "serviceId": 1}
+        ).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        operations = []
+        for appointment in batch:
+            try:
+                fields = appointment_time_fields(
+                    appointment.get("appointmentDate") or "",
+                    appointment.get("appointmentTime") or "",
+                    appointment.get("timezone") or "",
+                    appointment.get("serviceId")
+                )
+            except ValueError as e:
+                logger.warning(f"Cannot normalize appointment {appointment['_id']} time: {e}")
+                fields = {"startUtc": None, "endUtc": None}
+            operations.append(UpdateOne(
+                {"_id": appointment["_id"], "startUtc": {"$exists": False}},
+                {"$set": fields}
+            ))
+
+        result = await database.appointments.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+        logger.info(f"Appointment time backfill: {updated} updated so far")
+        await asyncio.sleep(pause_seconds)
+
+    if updated:
+        logger.info(f"Appointment time backfill complete: {updated} appointments updated")
+    return updated
@@ -0,0 +1,190 @@
+import heapq
+from datetime import datetime, date, timedelta, timezone
+from zoneinfo import ZoneInfo
+from typing import Optional, List, Dict, Any, Tuple
+from bson import ObjectId
+import logging
+
+from config import (
+    SUPPORTED_REGIONS,
+    SERVICE_LINES,
+    VISIT_DURATIONS,
+    DEFAULT_PROVIDER_ID
+)
+from services_data import ONE_OFF_SERVICES
+from services.ics_parser import merge_intervals
+from services.slot_engine import slot_engine
+
+logger = logging.getLogger(__name__)
+
+# Used when a booking or service has no configured length
+DEFAULT_VISIT_MINUTES = 15
+
+# Appointment statuses that occupy a slot without a live reservation
+BOOKED_STATUSES = ["scheduled", "completed"]
+
+
+def resolve_visit_duration(service: Optional[str]) -> Optional[int]:
+    """
+    Visit length in minutes for a service line key ('weight-loss'),
+    a visit type name ('Weight Loss') or a bookable service id ('glp-semaglutide')
+    """
+    if not service:
+        return None
+    if service in SERVICE_LINES:
+        return SERVICE_LINES[service]["duration_minutes"]
+    if service in VISIT_DURATIONS:
+        return VISIT_DURATIONS[service]
+    one_off = ONE_OFF_SERVICES.get(service)
+    if one_off and one_off.get("category") in SERVICE_LINES:
+        return SERVICE_LINES[one_off["category"]]["duration_minutes"]
+    if one_off:
+        return DEFAULT_VISIT_MINUTES
+    return None
+
+
+def _utc_timestamp(value: datetime) -> float:
+    """Epoch seconds for a naive UTC datetime as stored in Mongo"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+async def _reserved_intervals(
+    database,
+    provider_id: str,
+    window_start: datetime,
+    window_end: datetime,
+    exclude_appointment_id: Optional[str] = None
+) -> List[Tuple[float, float]]:
+    """Booked slots from slot_reservations (held and confirmed) as UTC intervals"""
+    # Reservations are keyed by UTC date; include the previous day so a visit
+    # starting before midnight UTC that runs into the window is still seen
+    query = {
+        "providerId": provider_id,
+        "date": {
+            "$gte": (window_start - timedelta(days=1)).strftime("%Y-%m-%d"),
+            "$lte": window_end.strftime("%Y-%m-%d")
+        }
+    }
+    if exclude_appointment_id:
+        query["appointmentId"] = {"$ne": exclude_appointment_id}
+    cursor = database.slot_reservations.find(
+        query,
+        {"_id": 0, "date": 1, "time": 1, "durationMinutes": 1}
+    ).sort([("date", 1), ("time", 1)])
+
+    intervals = []
+    async for reservation in cursor:
+        start = _utc_timestamp(datetime.strptime(f"{reservation['date']} {reservation['time']}", "%Y-%m-%d %H:%M"))
+        minutes = reservation.get("durationMinutes") or DEFAULT_VISIT_MINUTES
+        intervals.append((start, start + minutes * 60))
+    return intervals
+
+
+async def _appointment_intervals(
+    database,
+    window_start: datetime,
+    window_end: datetime,
+    exclude_appointment_id: Optional[str] = None
+) -> List[Tuple[float, float]]:
+    """
+    Scheduled and completed appointments as UTC intervals
+
+    Covers paid bookings without a reservation (made before
+    slot_reservations existed). Unpaid bookings are busy only while their
+    hold in slot_reservations lives, so an abandoned checkout frees its
+    slot when the hold expires.
+    """
+    # appointment_times imports this module for visit durations
+    from services.appointment_times import overlap_query
+
+    query = overlap_query(window_start, window_end, statuses=BOOKED_STATUSES)
+    if exclude_appointment_id and ObjectId.is_valid(exclude_appointment_id):
+        query["_id"] = {"$ne": ObjectId(exclude_appointment_id)}
+    cursor = database.appointments.find(query, {"_id": 0, "startUtc": 1, "endUtc": 1}).sort("startUtc", 1)
+
+    intervals = []
+    async for appointment in cursor:
+        intervals.append((_utc_timestamp(appointment["startUtc"]), _utc_timestamp(appointment["endUtc"])))
+    return intervals
+
+
+async def has_conflict(
+    database,
+    start: datetime,
+    end: datetime,
+    appointment_id: Optional[str] = None,
+    provider_id: Optional[str] = None
+) -> bool:
+    """
+    True if [start, end) overlaps another reservation or booked appointment
+
+    The unique slot index only rejects identical start times; this catches
+    an 08:15 booking inside an 08:00 30-minute visit.
+
+    Args:
+        start: UTC start of the visit
+        end: UTC end of the visit
+        appointment_id: The booking being checked, whose own slot is ignored
+        provider_id: Provider whose reservations to check
+    """
+    start_ts = start.timestamp()
+    end_ts = end.timestamp()
+    busy = await _reserved_intervals(
+        database, provider_id or DEFAULT_PROVIDER_ID, start, end, exclude_appointment_id=appointment_id
+    )
+    busy += await _appointment_intervals(database, start, end, exclude_appointment_id=appointment_id)
+    return any(busy_start < end_ts and busy_end > start_ts for busy_start, busy_end in busy)
+
+
+async def find_open_slots(
+    database,
+    calendar_index,
+    start_date: date,
+    end_date: date,
+    region: str,
+    duration_minutes: int,
+    provider_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Every open slot between two region-local dates (inclusive), excluding
+    DrChrono busy blocks, slot reservations and booked appointments
+
+    Args:
+        database: Motor database
+        calendar_index: CalendarAvailabilityService with the DrChrono busy blocks
+        start_date: First region-local day
+        end_date: Last region-local day
+        region: SUPPORTED_REGIONS key
+        duration_minutes: Visit length
+        provider_id: Provider whose reservations to check
+
+    Returns:
+        Dictionary with the region timezone and the open slots in region-local
+        date/time (the format create_appointment accepts) plus UTC start
+    """
+    region_tz_name = SUPPORTED_REGIONS[region]["timezone"]
+    region_tz = ZoneInfo(region_tz_name)
+
+    window_start = datetime(start_date.year, start_date.month, start_date.day, tzinfo=region_tz).astimezone(timezone.utc)
+    window_end = (
+        datetime(end_date.year, end_date.month, end_date.day, tzinfo=region_tz) + timedelta(days=1)
+    ).astimezone(timezone.utc)
+    # Nothing in the past is bookable
+    earliest = max(window_start, datetime.now(timezone.utc))
+
+    slot_minutes = slot_engine.grid_between(earliest, window_end, duration_minutes)
+
+    reserved = await _reserved_intervals(database, provider_id or DEFAULT_PROVIDER_ID, window_start, window_end)
+    booked = await _appointment_intervals(database, window_start, window_end)
+    calendar_checked = calendar_index.enabled and calendar_index.ready
+    calendar_busy = calendar_index.busy_between(window_start, window_end) if calendar_checked else []
+
+    # Both sources are sorted, so merging them is linear
+    busy_starts, busy_ends = merge_intervals(heapq.merge(calendar_busy, reserved, booked))
+    open_minutes = slot_minutes[slot_engine.open_mask(slot_minutes, duration_minutes, busy_starts, busy_ends)]
+
+    return {
+        "timezone": region_tz_name,
+        "calendarChecked": calendar_checked,
+        "slots": slot_engine.region_slots(open_minutes, region_tz_name)
+    }
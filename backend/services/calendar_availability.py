@@ -0,0 +1,154 @@
+import os
+import asyncio
+import bisect
+import httpx
+from array import array
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from typing import Optional, List, Dict, Tuple
+import logging
+
+from services.ics_parser import parse_busy_intervals
+from metrics import track_dependency
+
+logger = logging.getLogger(__name__)
+
+# Rebuild at least this often so the recurrence window keeps sliding forward
+INDEX_MAX_AGE = timedelta(hours=12)
+
+class CalendarAvailabilityService:
+    """
+    In-memory index of provider busy blocks from the DrChrono ICS feed.
+
+    The feed is fetched in the background with conditional requests
+    (ETag / Last-Modified), so availability checks never do outbound I/O
+    and are answered with binary searches over sorted arrays.
+    """
+
+    def __init__(self):
+        self.calendar_link = os.getenv("DRCHRONO_CALENDAR_LINK")
+        self.refresh_seconds = int(os.getenv("DRCHRONO_CALENDAR_REFRESH_SECONDS", "60"))
+        # Recurring events are expanded this far ahead of now
+        self.lookahead_days = int(os.getenv("DRCHRONO_CALENDAR_LOOKAHEAD_DAYS", "90"))
+        # Timezone for floating (no TZID, no Z) times in the feed
+        self.default_tz = ZoneInfo(os.getenv("DRCHRONO_CALENDAR_TIMEZONE", "UTC"))
+        self.enabled = bool(self.calendar_link and "placeholder" not in self.calendar_link)
+
+        # (starts, ends) swapped as one tuple so readers never see a half-built index
+        self._index: Tuple[array, array] = (array('d'), array('d'))
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.loaded_at: Optional[datetime] = None
+        self.last_checked_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.http = httpx.AsyncClient(timeout=httpx.Timeout(10.0, connect=5.0))
+
+    @property
+    def ready(self) -> bool:
+        """True once the feed has been loaded at least once"""
+        return self.loaded_at is not None
+
+    async def start(self):
+        """Start the background refresh loop (called on app startup)"""
+        if not self.enabled:
+            logger.info("DrChrono calendar link not configured - availability index disabled")
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Stop refreshing and close the HTTP client (called on app shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.http.aclose()
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"DrChrono calendar refresh failed: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    async def refresh(self) -> bool:
+        """
+        Fetch the feed if it changed and rebuild the index
+
+        Returns:
+            True if the index was rebuilt, False if the feed was unchanged
+        """
+        headers = {}
+        # Recurrences are expanded over a window relative to the build time,
+        # so an old index is rebuilt even if the feed itself is unchanged
+        if self.loaded_at and datetime.utcnow() - self.loaded_at < INDEX_MAX_AGE:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+
+        async with track_dependency("drchrono", "calendar_feed"):
+            response = await self.http.get(self.calendar_link, headers=headers)
+        self.last_checked_at = datetime.utcnow()
+
+        if response.status_code == 304:
+            return False
+        response.raise_for_status()
+
+        # Parsing a large feed is CPU bound - keep it off the event loop
+        now = datetime.now(timezone.utc)
+        self._index = await asyncio.to_thread(
+            parse_busy_intervals,
+            response.text,
+            now - timedelta(days=1),
+            now + timedelta(days=self.lookahead_days),
+            self.default_tz
+        )
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        self.loaded_at = self.last_checked_at
+
+        logger.info(f"DrChrono calendar index rebuilt: {len(self._index[0])} busy blocks")
+        return True
+
+    def find_conflicts(self, start: datetime, end: datetime) -> List[Dict[str, str]]:
+        """
+        Busy blocks overlapping [start, end)
+
+        Args:
+            start: Timezone-aware start of the requested slot
+            end: Timezone-aware end of the requested slot
+
+        Returns:
+            List of overlapping blocks as UTC ISO strings
+        """
+        starts, ends = self._index
+        start_ts = start.timestamp()
+        end_ts = end.timestamp()
+
+        # Blocks are disjoint and sorted, so overlaps form one contiguous run:
+        # from the first block ending after start to the last starting before end
+        first = bisect.bisect_right(ends, start_ts)
+        last = bisect.bisect_left(starts, end_ts)
+
+        return [
+            {
+                'start': datetime.fromtimestamp(starts[i], tz=timezone.utc).isoformat(),
+                'end': datetime.fromtimestamp(ends[i], tz=timezone.utc).isoformat()
+            }
+            for i in range(first, last)
+        ]
+
+    def busy_between(self, start: datetime, end: datetime) -> List[Tuple[float, float]]:
+        """Busy blocks overlapping [start, end) as sorted (start, end) epoch pairs"""
+        starts, ends = self._index
+        first = bisect.bisect_right(ends, start.timestamp())
+        last = bisect.bisect_left(starts, end.timestamp())
+        return list(zip(starts[first:last], ends[first:last]))
@@ -0,0 +1,133 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import logging
+
+from services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Stripe payment_status values that never change again
+TERMINAL_PAYMENT_STATUSES = ("paid", "no_payment_required")
+
+Fetch = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+def is_terminal(payment: Dict[str, Any]) -> bool:
+    """True if a payment_transactions document is in a final state"""
+    return payment.get("paymentStatus") in TERMINAL_PAYMENT_STATUSES or payment.get("status") == "expired"
+
+
+def snapshot_from_transaction(payment: Dict[str, Any]) -> Dict[str, Any]:
+    """Checkout status response built from the stored transaction"""
+    paid = payment.get("paymentStatus") in TERMINAL_PAYMENT_STATUSES
+    return {
+        "status": "complete" if paid else payment.get("status"),
+        "paymentStatus": payment.get("paymentStatus"),
+        "amount": payment.get("amount"),
+        "currency": payment.get("currency"),
+        "metadata": payment.get("metadata") or {}
+    }
+
+
+class CheckoutStatusCache:
+    """
+    Read path for checkout status polls.
+
+    Sessions already final in payment_transactions (e.g. marked paid by the
+    webhook) are answered from an in-process LRU or from Mongo. Open sessions
+    go upstream at most once per CHECKOUT_STATUS_MIN_INTERVAL_SECONDS per
+    session, and concurrent polls for one session share a single call.
+    """
+
+    def __init__(self, database):
+        self.db = database
+        self.min_interval = float(os.getenv("CHECKOUT_STATUS_MIN_INTERVAL_SECONDS", "3"))
+        self.max_entries = int(os.getenv("CHECKOUT_STATUS_CACHE_SIZE", "10000"))
+
+        # session_id -> final snapshot
+        self._terminal: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # session_id -> (monotonic fetch time, snapshot) for open sessions
+        self._recent: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._flights = SingleFlight()
+
+        self.counters = {
+            "memory_hits": 0,
+            "db_hits": 0,
+            "rate_limited": 0,
+            "upstream_calls": 0,
+            "upstream_errors": 0
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus cache sizes"""
+        counters = {**self.counters, "coalesced": self._flights.coalesced}
+        hits = counters["memory_hits"] + counters["db_hits"] + counters["rate_limited"] + counters["coalesced"]
+        total = hits + counters["upstream_calls"]
+        return {
+            **counters,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+            "terminal_entries": len(self._terminal),
+            "recent_entries": len(self._recent)
+        }
+
+    def _remember(self, cache: OrderedDict, key: str, value: Any):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_entries:
+            cache.popitem(last=False)
+
+    def mark_terminal(self, session_id: str, snapshot: Dict[str, Any]):
+        """Record a final status learned elsewhere (webhook, upstream refresh)"""
+        self._recent.pop(session_id, None)
+        self._remember(self._terminal, session_id, snapshot)
+
+    async def get(self, session_id: str, fetch: Fetch) -> Optional[Dict[str, Any]]:
+        """
+        Current status for a checkout session
+
+        Args:
+            session_id: Stripe checkout session id
+            fetch: Called with the transaction document when Stripe must be
+                asked; returns the status snapshot
+
+        Returns:
+            Status snapshot, or None if the session is unknown
+        """
+        cached = self._terminal.get(session_id)
+        if cached is not None:
+            self._terminal.move_to_end(session_id)
+            self.counters["memory_hits"] += 1
+            return cached
+
+        recent = self._recent.get(session_id)
+        if recent is not None and time.monotonic() - recent[0] < self.min_interval:
+            self.counters["rate_limited"] += 1
+            return recent[1]
+
+        return await self._flights.run(session_id, lambda: self._load(session_id, fetch))
+
+    async def _load(self, session_id: str, fetch: Fetch) -> Optional[Dict[str, Any]]:
+        payment = await self.db.payment_transactions.find_one({"sessionId": session_id})
+        if not payment:
+            return None
+
+        if is_terminal(payment):
+            self.counters["db_hits"] += 1
+            snapshot = snapshot_from_transaction(payment)
+            self.mark_terminal(session_id, snapshot)
+            return snapshot
+
+        self.counters["upstream_calls"] += 1
+        try:
+            snapshot = await fetch(payment)
+        except Exception:
+            self.counters["upstream_errors"] += 1
+            raise
+
+        if snapshot.get("paymentStatus") in TERMINAL_PAYMENT_STATUSES or snapshot.get("status") == "expired":
+            self.mark_terminal(session_id, snapshot)
+        else:
+            self._remember(self._recent, session_id, (time.monotonic(), snapshot))
+        return snapshot
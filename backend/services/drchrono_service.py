@@ -1,9 +1,11 @@
 import os
-import requests
+import httpx
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 import logging
 
+from metrics import track_dependency
+
 logger = logging.getLogger(__name__)
 
 class DrChronoService:
@@ -17,11 +19,30 @@ class DrChronoService:
         self.token_url = os.getenv("DRCHRONO_TOKEN_URL", "https://app.drchrono.com/o/token/")
         self.api_base = os.getenv("DRCHRONO_API_BASE", "https://app.drchrono.com/api")
         
+        # Shared keep-alive pool for every DrChrono call made by this process.
+        # All requests go to the DrChrono host, so the pool limits are
+        # effectively per-host limits.
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                float(os.getenv("DRCHRONO_TIMEOUT_SECONDS", "15")),
+                connect=float(os.getenv("DRCHRONO_CONNECT_TIMEOUT_SECONDS", "5"))
+            ),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("DRCHRONO_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("DRCHRONO_MAX_KEEPALIVE_CONNECTIONS", "10")),
+                keepalive_expiry=float(os.getenv("DRCHRONO_KEEPALIVE_EXPIRY_SECONDS", "30"))
+            )
+        )
+        
         # Check if properly configured
         self.enabled = bool(self.client_id and self.client_secret)
         if not self.enabled:
             logger.warning("DrChrono credentials not configured")
     
+    async def close(self):
+        """Close pooled HTTP connections (called on app shutdown)"""
+        await self.http.aclose()
+    
     def get_authorization_url(self, state: Optional[str] = None) -> str:
         """
         Generate OAuth authorization URL for provider to connect DrChrono
@@ -56,16 +77,17 @@ class DrChronoService:
             Token response with access_token, refresh_token, expires_in
         """
         try:
-            response = requests.post(
-                self.token_url,
-                data={
-                    "code": authorization_code,
-                    "grant_type": "authorization_code",
-                    "redirect_uri": self.redirect_uri,
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret
-                }
-            )
+            async with track_dependency("drchrono", "exchange_code_for_token"):
+                response = await self.http.post(
+                    self.token_url,
+                    data={
+                        "code": authorization_code,
+                        "grant_type": "authorization_code",
+                        "redirect_uri": self.redirect_uri,
+                        "client_id": self.client_id,
+                        "client_secret": self.client_secret
+                    }
+                )
             
             response.raise_for_status()
             token_data = response.json()
@@ -90,15 +112,16 @@ class DrChronoService:
     async def refresh_access_token(self, refresh_token: str) -> Dict[str, Any]:
         """Refresh expired access token"""
         try:
-            response = requests.post(
-                self.token_url,
-                data={
-                    "grant_type": "refresh_token",
-                    "refresh_token": refresh_token,
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret
-                }
-            )
+            async with track_dependency("drchrono", "refresh_access_token"):
+                response = await self.http.post(
+                    self.token_url,
+                    data={
+                        "grant_type": "refresh_token",
+                        "refresh_token": refresh_token,
+                        "client_id": self.client_id,
+                        "client_secret": self.client_secret
+                    }
+                )
             
             response.raise_for_status()
             token_data = response.json()
@@ -117,7 +140,7 @@ class DrChronoService:
                 "error": str(e)
             }
     
-    def _make_api_request(
+    async def _make_api_request(
         self, 
         method: str, 
         endpoint: str, 
@@ -134,18 +157,21 @@ class DrChronoService:
             
             url = f"{self.api_base}/{endpoint.lstrip('/')}"
             
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=headers,
-                json=data,
-                params=params
-            )
+            # Label by resource only - paths carry patient/appointment ids
+            operation = f"{method.upper()} {endpoint.strip('/').split('/')[0]}"
+            async with track_dependency("drchrono", operation):
+                response = await self.http.request(
+                    method=method,
+                    url=url,
+                    headers=headers,
+                    json=data,
+                    params=params
+                )
             
             response.raise_for_status()
             return response.json()
             
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             logger.error(f"DrChrono API error: {e}")
             raise
         except Exception as e:
@@ -171,7 +197,7 @@ class DrChronoService:
         """
         try:
             # Search for existing patient by email
-            existing = self._make_api_request(
+            existing = await self._make_api_request(
                 "GET",
                 "/patients",
                 access_token,
@@ -196,7 +222,7 @@ class DrChronoService:
             if existing.get("results") and len(existing["results"]) > 0:
                 # Update existing patient
                 patient_id = existing["results"][0]["id"]
-                result = self._make_api_request(
+                result = await self._make_api_request(
                     "PATCH",
                     f"/patients/{patient_id}",
                     access_token,
@@ -205,7 +231,7 @@ class DrChronoService:
                 logger.info(f"Updated patient {patient_id} in DrChrono")
             else:
                 # Create new patient
-                result = self._make_api_request(
+                result = await self._make_api_request(
                     "POST",
                     "/patients",
                     access_token,
@@ -259,7 +285,7 @@ class DrChronoService:
                 "allow_overlapping": False
             }
             
-            result = self._make_api_request(
+            result = await self._make_api_request(
                 "POST",
                 "/appointments",
                 access_token,
@@ -371,7 +397,7 @@ Previous Attempts: {', '.join(screening.get('previous_weight_loss_attempts', [])
                 "clinical_note_sections": sections
             }
             
-            result = self._make_api_request(
+            result = await self._make_api_request(
                 "POST",
                 "/clinical_notes",
                 access_token,
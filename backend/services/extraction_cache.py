@@ -0,0 +1,137 @@
+import os
+import hashlib
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict
+import logging
+
+from services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+Extract = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+def normalize_transcript(transcript: str) -> str:
+    """Transcript with Unicode normalized and whitespace runs collapsed"""
+    return " ".join(unicodedata.normalize("NFC", transcript).split())
+
+
+def extraction_key(transcript: str, model: str, prompt_version: str) -> str:
+    """sha256 identifying one extraction of a transcript by a model and prompt"""
+    material = "\0".join([model, prompt_version, normalize_transcript(transcript)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """
+    Persistent cache of LLM medical-data extractions.
+
+    Entries live in llm_extraction_cache keyed by extraction_key, so a
+    retried or resubmitted transcript is answered from Mongo instead of the
+    LLM. Only the structured result is stored, never the transcript. Entries
+    expire EXTRACTION_CACHE_TTL_DAYS after they are written (TTL index on
+    expiresAt), and once the collection grows past EXTRACTION_CACHE_MAX_ENTRIES
+    the least recently used are deleted. Concurrent requests for one key in
+    this process share a single extraction.
+    """
+
+    def __init__(self, database):
+        self.collection = database.llm_extraction_cache
+        self.ttl = timedelta(days=float(os.getenv("EXTRACTION_CACHE_TTL_DAYS", "30")))
+        self.max_entries = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "5000"))
+
+        self._flights = SingleFlight()
+
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evicted": 0,
+            "errors": 0
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus hit ratio"""
+        counters = {**self.counters, "coalesced": self._flights.coalesced}
+        hits = counters["hits"] + counters["coalesced"]
+        total = hits + counters["misses"]
+        return {
+            **counters,
+            "hit_ratio": round(hits / total, 4) if total else 0.0
+        }
+
+    async def get_or_extract(self, key: str, extract: Extract) -> Dict[str, Any]:
+        """
+        Cached extraction for `key`, running `extract()` on a miss
+
+        Args:
+            key: extraction_key of the transcript
+            extract: Returns a {"success", "data"} extraction result
+
+        Returns:
+            Extraction result; cache hits carry "cached": True
+        """
+        data = await self._lookup(key)
+        if data is not None:
+            self.counters["hits"] += 1
+            return {"success": True, "data": data, "cached": True}
+
+        return await self._flights.run(key, lambda: self._extract(key, extract))
+
+    async def _extract(self, key: str, extract: Extract) -> Dict[str, Any]:
+        self.counters["misses"] += 1
+        result = await extract()
+        if self._cacheable(result):
+            await self._store(key, result["data"])
+        return result
+
+    @staticmethod
+    def _cacheable(result: Dict[str, Any]) -> bool:
+        # Failures and unparsed model output are worth another attempt
+        data = result.get("data")
+        return bool(result.get("success")) and isinstance(data, dict) and "raw_extraction" not in data
+
+    async def _lookup(self, key: str):
+        now = datetime.utcnow()
+        try:
+            # The TTL monitor runs once a minute; do not serve entries it has not reached yet
+            entry = await self.collection.find_one_and_update(
+                {"_id": key, "expiresAt": {"$gt": now}},
+                {"$set": {"lastUsedAt": now}, "$inc": {"hits": 1}},
+                projection={"data": 1}
+            )
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.warning(f"Extraction cache lookup failed: {e}")
+            return None
+        return entry["data"] if entry else None
+
+    async def _store(self, key: str, data: Dict[str, Any]):
+        now = datetime.utcnow()
+        try:
+            await self.collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "data": data,
+                    "createdAt": now,
+                    "lastUsedAt": now,
+                    "expiresAt": now + self.ttl,
+                    "hits": 0
+                }},
+                upsert=True
+            )
+            self.counters["stores"] += 1
+            await self._evict()
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.warning(f"Extraction cache store failed: {e}")
+
+    async def _evict(self):
+        # estimated_document_count reads collection metadata, so this is cheap per store
+        excess = await self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        oldest = await self.collection.find({}, {"_id": 1}).sort("lastUsedAt", 1).limit(excess).to_list(excess)
+        result = await self.collection.delete_many({"_id": {"$in": [entry["_id"] for entry in oldest]}})
+        self.counters["evicted"] += result.deleted_count
@@ -0,0 +1,428 @@
+"""
+Streaming ICS (RFC 5545) parser producing provider busy intervals.
+
+Reads the feed line by line, unfolding continuation lines as it goes, and
+turns each VEVENT into UTC (start, end) intervals:
+
+- DTEND or DURATION give the real event length (all-day events span the day)
+- TZID parameters are resolved with zoneinfo; floating times use the
+  default timezone
+- RRULE/RDATE/EXDATE recurrences are expanded only over a bounded
+  lookahead window, with RECURRENCE-ID overrides replacing their instance;
+  single events are kept however far ahead they are
+- CANCELLED and TRANSPARENT (free) events are skipped
+
+The result is a pair of sorted, disjoint start/end arrays (epoch seconds)
+that CalendarAvailabilityService queries with binary search.
+"""
+import re
+import time
+from functools import lru_cache
+from array import array
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from typing import Iterable, Iterator, Optional, List, Tuple, Dict, Any
+from dateutil.rrule import rrulestr, rruleset
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Safety cap on instances generated from a single recurring event
+MAX_OCCURRENCES_PER_EVENT = 5000
+
+# Length used when an event has neither DTEND nor DURATION
+DEFAULT_EVENT_MINUTES = 15
+
+DURATION_RE = re.compile(
+    r'^(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$'
+)
+
+
+def unfold_lines(source: Iterable[str]) -> Iterator[str]:
+    """
+    Yield logical content lines from raw ICS text chunks or lines.
+
+    Continuation lines (starting with a space or tab) are appended to the
+    previous line. Accepts any iterable of strings, including a file object
+    or a streamed response, so the whole feed never needs to be split in memory.
+    """
+    current: Optional[str] = None
+    pending = ""
+    for chunk in source:
+        pending += chunk
+        *complete, pending = pending.split('\n')
+        for raw in complete:
+            raw = raw.rstrip('\r')
+            if raw[:1] in (' ', '\t'):
+                if current is not None:
+                    current += raw[1:]
+                continue
+            if current is not None:
+                yield current
+            current = raw
+    pending = pending.rstrip('\r')
+    if pending[:1] in (' ', '\t') and current is not None:
+        current += pending[1:]
+    elif pending:
+        if current is not None:
+            yield current
+        current = pending
+    if current is not None:
+        yield current
+
+
+def parse_content_line(line: str) -> Tuple[str, Dict[str, str], str]:
+    """Split 'NAME;PARAM=VAL:value' into (NAME, {PARAM: VAL}, value)"""
+    # The value starts at the first colon outside a quoted parameter value
+    split_at = line.find(':')
+    quote = line.find('"')
+    if 0 <= quote < split_at:
+        in_quotes = False
+        split_at = -1
+        for i, ch in enumerate(line):
+            if ch == '"':
+                in_quotes = not in_quotes
+            elif ch == ':' and not in_quotes:
+                split_at = i
+                break
+    if split_at < 0:
+        return line.upper(), {}, ""
+
+    head, value = line[:split_at], line[split_at + 1:]
+    name, *raw_params = head.split(';')
+    params = {}
+    for raw in raw_params:
+        key, _, val = raw.partition('=')
+        params[key.upper()] = val.strip('"')
+    return name.upper(), params, value
+
+
+@lru_cache(maxsize=256)
+def _zone_for_tzid(tzid: str) -> Optional[ZoneInfo]:
+    candidates = [tzid]
+    # Exporters often prefix IANA names, e.g. /mozilla.org/20050126_1/America/New_York
+    parts = tzid.strip('/').split('/')
+    if len(parts) > 2:
+        candidates.append('/'.join(parts[-2:]))
+    for candidate in candidates:
+        try:
+            return ZoneInfo(candidate)
+        except Exception:
+            continue
+    return None
+
+
+def resolve_timezone(tzid: Optional[str], default_tz: Any) -> Any:
+    """Map an ICS TZID to a tzinfo, falling back to the default timezone"""
+    if not tzid:
+        return default_tz
+    zone = _zone_for_tzid(tzid)
+    if zone is None:
+        logger.debug(f"Unknown ICS TZID {tzid}, using default timezone")
+        return default_tz
+    return zone
+
+
+def parse_ics_datetime(value: str, params: Dict[str, str], default_tz: Any) -> Tuple[datetime, bool]:
+    """
+    Parse a DATE or DATE-TIME property value into an aware datetime
+
+    Returns:
+        (datetime, is_all_day)
+    """
+    value = value.strip()
+    # Fixed-width fields; slicing is several times faster than strptime
+    year, month, day = int(value[0:4]), int(value[4:6]), int(value[6:8])
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return datetime(year, month, day, tzinfo=resolve_timezone(params.get('TZID'), default_tz)), True
+    if value[8:9] != 'T':
+        raise ValueError(f"Invalid ICS date-time: {value}")
+    tz = timezone.utc if value.endswith('Z') else resolve_timezone(params.get('TZID'), default_tz)
+    return datetime(year, month, day, int(value[9:11]), int(value[11:13]), int(value[13:15]), tzinfo=tz), False
+
+
+def parse_duration(value: str) -> timedelta:
+    """Parse an RFC 5545 DURATION value such as PT1H30M or P1D"""
+    match = DURATION_RE.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid ICS duration: {value}")
+    delta = timedelta(
+        weeks=int(match.group('weeks') or 0),
+        days=int(match.group('days') or 0),
+        hours=int(match.group('hours') or 0),
+        minutes=int(match.group('minutes') or 0),
+        seconds=int(match.group('seconds') or 0)
+    )
+    return -delta if match.group('sign') == '-' else delta
+
+
+def iter_events(lines: Iterable[str]) -> Iterator[Dict[str, List[Tuple[Dict[str, str], str]]]]:
+    """
+    Yield the properties of each VEVENT as {NAME: [(params, value), ...]}.
+    Properties of nested components (VALARM) are ignored.
+    """
+    event = None
+    nested = 0
+    for line in lines:
+        if not line:
+            continue
+        name, params, value = parse_content_line(line)
+        if name == 'BEGIN':
+            if value.upper() == 'VEVENT':
+                event, nested = {}, 0
+            elif event is not None:
+                nested += 1
+            continue
+        if name == 'END':
+            if value.upper() == 'VEVENT' and event is not None:
+                yield event
+                event = None
+            elif event is not None and nested:
+                nested -= 1
+            continue
+        if event is not None and not nested:
+            event.setdefault(name, []).append((params, value))
+
+
+def _first(event: Dict[str, list], name: str) -> Optional[Tuple[Dict[str, str], str]]:
+    values = event.get(name)
+    return values[0] if values else None
+
+
+def _event_span(event: Dict[str, list], default_tz: Any) -> Optional[Tuple[datetime, timedelta, bool]]:
+    """Start, length and all-day flag of an event, or None if unusable"""
+    dtstart = _first(event, 'DTSTART')
+    if dtstart is None:
+        return None
+    start, all_day = parse_ics_datetime(dtstart[1], dtstart[0], default_tz)
+
+    dtend = _first(event, 'DTEND')
+    duration = _first(event, 'DURATION')
+    if dtend is not None:
+        end, _ = parse_ics_datetime(dtend[1], dtend[0], default_tz)
+        length = end - start
+    elif duration is not None:
+        length = parse_duration(duration[1])
+    elif all_day:
+        length = timedelta(days=1)
+    else:
+        length = timedelta(minutes=DEFAULT_EVENT_MINUTES)
+
+    if length <= timedelta(0):
+        return None
+    return start, length, all_day
+
+
+def _date_list(entries: List[Tuple[Dict[str, str], str]], default_tz: Any) -> List[datetime]:
+    """Parse comma-separated EXDATE/RDATE values"""
+    parsed = []
+    for params, value in entries:
+        for part in value.split(','):
+            if part:
+                parsed.append(parse_ics_datetime(part, params, default_tz)[0])
+    return parsed
+
+
+def _normalize_rrule(rule: str, start: datetime) -> str:
+    """
+    Rewrite a floating UNTIL as UTC so dateutil accepts it alongside an
+    aware DTSTART (RFC 5545 requires this, but many exporters skip it).
+    """
+    parts = []
+    for part in rule.split(';'):
+        key, _, value = part.partition('=')
+        if key.upper() == 'UNTIL' and not value.endswith('Z'):
+            if len(value) == 8:
+                until = datetime.strptime(value, '%Y%m%d').replace(tzinfo=start.tzinfo) + timedelta(days=1, seconds=-1)
+            else:
+                until = datetime.strptime(value[:15], '%Y%m%dT%H%M%S').replace(tzinfo=start.tzinfo)
+            value = until.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        parts.append(f"{key}={value}")
+    return ';'.join(parts)
+
+
+def _expand(
+    event: Dict[str, list],
+    start: datetime,
+    length: timedelta,
+    window_start: datetime,
+    window_end: datetime,
+    default_tz: Any,
+    overridden: set
+) -> Iterator[Tuple[float, float]]:
+    """Expand a recurring event's instances that overlap the window"""
+    rule_set = rruleset()
+    # DTSTART is always the first instance (the set drops duplicates)
+    rule_set.rdate(start)
+    for _, value in event.get('RRULE', []):
+        rule_set.rrule(rrulestr(_normalize_rrule(value, start), dtstart=start))
+    for rdate in _date_list(event.get('RDATE', []), default_tz):
+        rule_set.rdate(rdate)
+    for exdate in _date_list(event.get('EXDATE', []), default_tz):
+        rule_set.exdate(exdate)
+
+    # Instances that started before the window can still overlap it
+    generated = 0
+    for occurrence in rule_set.xafter(window_start - length, inc=True):
+        if occurrence >= window_end or generated >= MAX_OCCURRENCES_PER_EVENT:
+            break
+        generated += 1
+        occurrence_ts = occurrence.timestamp()
+        if occurrence_ts in overridden:
+            continue
+        yield occurrence_ts, (occurrence + length).timestamp()
+
+
+def merge_intervals(intervals: Iterable[Tuple[float, float]]) -> Tuple[array, array]:
+    """
+    Sort and coalesce overlapping intervals into disjoint blocks.
+
+    Returns parallel start/end arrays that are both sorted, which is what
+    lets availability checks answer with two binary searches.
+    """
+    starts = array('d')
+    ends = array('d')
+    for start, end in sorted(intervals):
+        if ends and start <= ends[-1]:
+            if end > ends[-1]:
+                ends[-1] = end
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+def parse_busy_intervals(
+    source: Iterable[str],
+    window_start: datetime,
+    window_end: datetime,
+    default_tz: Any = timezone.utc
+) -> Tuple[array, array]:
+    """
+    Parse an ICS feed into merged busy intervals from window_start on
+
+    Args:
+        source: ICS text, or any iterable of text chunks/lines
+        window_start: Aware datetime; earlier instances are dropped
+        window_end: Aware datetime bounding recurrence expansion only
+        default_tz: Timezone for floating times and all-day events
+
+    Returns:
+        (starts, ends) sorted, disjoint UTC epoch-second arrays
+    """
+    if isinstance(source, str):
+        source = (source,)
+
+    window_start_ts = window_start.timestamp()
+    intervals: List[Tuple[float, float]] = []
+    recurring = []
+    # RECURRENCE-ID instance starts by UID; they replace the generated instance
+    overrides: Dict[str, set] = {}
+
+    for event in iter_events(unfold_lines(source)):
+        try:
+            status = _first(event, 'STATUS')
+            transp = _first(event, 'TRANSP')
+            recurrence_id = _first(event, 'RECURRENCE-ID')
+            uid = (_first(event, 'UID') or ({}, ''))[1]
+
+            if recurrence_id is not None:
+                overrides.setdefault(uid, set()).add(
+                    parse_ics_datetime(recurrence_id[1], recurrence_id[0], default_tz)[0].timestamp()
+                )
+            if status and status[1].upper() == 'CANCELLED':
+                continue
+            if transp and transp[1].upper() == 'TRANSPARENT':
+                continue
+
+            span = _event_span(event, default_tz)
+            if span is None:
+                continue
+            start, length, _ = span
+
+            if ('RRULE' in event or 'RDATE' in event) and recurrence_id is None:
+                # Expanded after the stream so overrides later in the feed apply
+                recurring.append((uid, event, start, length))
+                continue
+
+            start_ts = start.timestamp()
+            end_ts = start_ts + length.total_seconds()
+            # No upper bound: a single event past the window must still block its slot
+            if end_ts > window_start_ts:
+                intervals.append((start_ts, end_ts))
+        except Exception as e:
+            logger.debug(f"Skipping unparseable ICS event: {e}")
+            continue
+
+    for uid, event, start, length in recurring:
+        try:
+            intervals.extend(_expand(
+                event, start, length, window_start, window_end, default_tz, overrides.get(uid, set())
+            ))
+        except Exception as e:
+            logger.debug(f"Skipping unexpandable recurring ICS event {uid}: {e}")
+            continue
+
+    return merge_intervals(intervals)
+
+
+def _synthetic_calendar(single_events: int, recurring_events: int, start: datetime) -> Iterator[str]:
+    """Generate a large feed with folded lines, TZIDs and weekly recurrences"""
+    yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//MedRx//Benchmark//EN\r\n"
+    for i in range(single_events):
+        event_start = start + timedelta(minutes=30 * i)
+        yield (
+            "BEGIN:VEVENT\r\n"
+            f"UID:single-{i}@medrx\r\n"
+            f"DTSTART;TZID=Pacific/Guam:{event_start.strftime('%Y%m%dT%H%M%S')}\r\n"
+            "DURATION:PT15M\r\n"
+            "SUMMARY:Patient consultation with a deliberately long summary so that\r\n"
+            " the exporter folds it onto a continuation line\r\n"
+            "END:VEVENT\r\n"
+        )
+    for i in range(recurring_events):
+        event_start = start + timedelta(days=i % 7, hours=8 + i % 10)
+        event_end = event_start + timedelta(minutes=30)
+        yield (
+            "BEGIN:VEVENT\r\n"
+            f"UID:recurring-{i}@medrx\r\n"
+            f"DTSTART;TZID=Pacific/Guam:{event_start.strftime('%Y%m%dT%H%M%S')}\r\n"
+            f"DTEND;TZID=Pacific/Guam:{event_end.strftime('%Y%m%dT%H%M%S')}\r\n"
+            "RRULE:FREQ=WEEKLY;INTERVAL=1\r\n"
+            "END:VEVENT\r\n"
+        )
+    yield "END:VCALENDAR\r\n"
+
+
+def _benchmark(single_events: int = 50000, recurring_events: int = 500, queries: int = 100000):
+    """Time parsing a large synthetic feed and querying the resulting index"""
+    import bisect
+    import random
+
+    start = datetime(2025, 1, 6, 8, 0)
+    window_start = start.replace(tzinfo=timezone.utc)
+    window_end = window_start + timedelta(days=3 * 365)
+    feed = ''.join(_synthetic_calendar(single_events, recurring_events, start))
+
+    began = time.perf_counter()
+    starts, ends = parse_busy_intervals(feed, window_start, window_end)
+    parse_seconds = time.perf_counter() - began
+
+    span = window_end.timestamp() - window_start.timestamp()
+    probes = [window_start.timestamp() + random.random() * span for _ in range(queries)]
+    began = time.perf_counter()
+    busy = 0
+    for probe in probes:
+        i = bisect.bisect_right(ends, probe)
+        busy += i < len(starts) and starts[i] < probe + 900
+    query_seconds = time.perf_counter() - began
+
+    print(f"feed: {len(feed) / 1e6:.1f} MB, {single_events} single + {recurring_events} weekly events")
+    print(f"parse: {parse_seconds * 1000:.0f} ms -> {len(starts)} merged busy blocks")
+    print(f"query: {queries} checks in {query_seconds * 1000:.0f} ms "
+          f"({query_seconds / queries * 1e6:.2f} us/check, {busy} busy)")
+
+
+if __name__ == "__main__":
+    _benchmark()
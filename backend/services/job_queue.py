@@ -0,0 +1,233 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class JobQueue:
+    """
+    Mongo-backed work queue drained by a fixed pool of asyncio workers.
+
+    Jobs are documents in `collection`. A worker claims one with a single
+    find_one_and_update (so several server processes can share a queue),
+    holds it under a lease, and on failure reschedules it with exponential
+    backoff until max_attempts is reached. Jobs whose lease runs out (the
+    worker's process died) are claimed again.
+
+    Handlers are registered per job kind and receive the job payload.
+    """
+
+    def __init__(
+        self,
+        database,
+        collection: str,
+        workers: int = 2,
+        max_attempts: int = 5,
+        backoff_seconds: float = 5.0,
+        max_backoff_seconds: float = 600.0,
+        lease_seconds: float = 120.0,
+        poll_seconds: float = 2.0
+    ):
+        self.collection = database[collection]
+        self.name = collection
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+
+        self._handlers: Dict[str, Handler] = {}
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+
+    def register(self, kind: str, handler: Handler):
+        """Handle jobs of `kind` with `handler(payload)`; raising schedules a retry"""
+        self._handlers[kind] = handler
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None) -> str:
+        """
+        Add a job and wake an idle worker
+
+        Args:
+            kind: Registered job kind
+            payload: BSON-serializable handler input
+            dedupe_key: If given, a second job with the same key is not added
+
+        Returns:
+            Job id (the existing job's id for a duplicate dedupe_key)
+        """
+        now = datetime.utcnow()
+        job = {
+            "kind": kind,
+            "payload": payload,
+            "status": PENDING,
+            "attempts": 0,
+            "nextAttemptAt": now,
+            "createdAt": now,
+            "updatedAt": now
+        }
+        if dedupe_key:
+            job["dedupeKey"] = dedupe_key
+        try:
+            result = await self.collection.insert_one(job)
+            job_id = str(result.inserted_id)
+        except DuplicateKeyError:
+            existing = await self.collection.find_one({"dedupeKey": dedupe_key}, {"_id": 1})
+            return str(existing["_id"])
+
+        self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Job document by id, or None"""
+        try:
+            return await self.collection.find_one({"_id": ObjectId(job_id)}, projection)
+        except Exception:
+            return None
+
+    async def wait(
+        self,
+        job_id: str,
+        timeout: float,
+        projection: Optional[Dict[str, Any]] = None,
+        interval: float = 0.5
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Long-poll a job until it is done or failed
+
+        Polls by _id, so it sees jobs finished by workers in other processes.
+
+        Returns:
+            The finished job, the job as it stands when `timeout` runs out,
+            or None if there is no such job
+        """
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            job = await self.get(job_id, projection)
+            if job is None or job.get("status") in (DONE, FAILED):
+                return job
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                return job
+            await asyncio.sleep(min(interval, remaining))
+
+    async def start(self):
+        """Start the worker pool (called on app startup)"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        logger.info(f"{self.name}: started {self.workers} workers")
+
+    async def stop(self):
+        """Stop the workers; a job in flight is retried after its lease expires"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": PENDING, "nextAttemptAt": {"$lte": now}},
+                    {"status": RUNNING, "leaseUntil": {"$lt": now}}
+                ]
+            },
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "leaseUntil": now + timedelta(seconds=self.lease_seconds),
+                    "updatedAt": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("nextAttemptAt", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_seconds * (2 ** (attempts - 1)), self.max_backoff_seconds)
+        # Jitter so retries of a burst of failures do not line up
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _worker(self, number: int):
+        while True:
+            try:
+                job = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"{self.name}: claim failed: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]):
+        handler = self._handlers.get(job["kind"])
+        now = datetime.utcnow()
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler registered for job kind '{job['kind']}'")
+            result = await handler(job.get("payload") or {})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            attempts = job.get("attempts", 1)
+            if attempts >= self.max_attempts:
+                logger.error(f"{self.name}: job {job['_id']} ({job['kind']}) failed permanently: {e}")
+                update = {"status": FAILED, "lastError": str(e), "finishedAt": now, "updatedAt": now}
+            else:
+                delay = self._backoff(attempts)
+                logger.warning(
+                    f"{self.name}: job {job['_id']} ({job['kind']}) attempt {attempts} failed, "
+                    f"retrying in {delay:.0f}s: {e}"
+                )
+                update = {
+                    "status": PENDING,
+                    "lastError": str(e),
+                    "nextAttemptAt": now + timedelta(seconds=delay),
+                    "updatedAt": now
+                }
+            await self.collection.update_one(
+                {"_id": job["_id"]},
+                {"$set": update, "$unset": {"leaseUntil": ""}}
+            )
+            return
+
+        await self.collection.update_one(
+            {"_id": job["_id"]},
+            {
+                "$set": {"status": DONE, "result": result, "finishedAt": now, "updatedAt": now},
+                "$unset": {"leaseUntil": ""}
+            }
+        )
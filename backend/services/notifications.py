@@ -0,0 +1,72 @@
+import os
+from typing import Optional, Dict, Any
+import logging
+
+from services.job_queue import JobQueue
+from services.sms_service import SMSService
+
+logger = logging.getLogger(__name__)
+
+BOOKING_ALERT = "sms.booking_alert"
+
+
+class NotificationService:
+    """
+    Outbound notifications delivered through a persisted queue.
+
+    Request handlers enqueue and return immediately; a small worker pool
+    sends through Twilio with retries, so SMS throughput is bounded by
+    NOTIFICATION_WORKERS rather than by request concurrency.
+    """
+
+    def __init__(self, database, sms_service: Optional[SMSService] = None):
+        self.sms = sms_service or SMSService()
+        self.queue = JobQueue(
+            database,
+            "notification_jobs",
+            workers=int(os.getenv("NOTIFICATION_WORKERS", "2")),
+            max_attempts=int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5")),
+            backoff_seconds=float(os.getenv("NOTIFICATION_BACKOFF_SECONDS", "10"))
+        )
+        self.queue.register(BOOKING_ALERT, self._deliver_booking_alert)
+
+    async def start(self):
+        await self.queue.start()
+
+    async def stop(self):
+        await self.queue.stop()
+
+    async def enqueue_booking_alert(self, appointment: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue the new-booking SMS alert for an appointment document
+
+        Deduplicated per appointment, so repeated payment confirmations
+        send one alert.
+        """
+        try:
+            job_id = await self.queue.enqueue(
+                BOOKING_ALERT,
+                {
+                    'patientInfo': appointment.get('patientInfo', {}),
+                    'serviceName': appointment.get('serviceName', 'Unknown Service'),
+                    'date': appointment.get('appointmentDate', 'N/A'),
+                    'time': appointment.get('appointmentTime', 'N/A'),
+                    'timezone': appointment.get('timezone', 'N/A')
+                },
+                dedupe_key=f"{BOOKING_ALERT}:{appointment['_id']}"
+            )
+            return {"success": True, "job_id": job_id}
+        except Exception as e:
+            logger.error(f"Failed to queue booking alert: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def _deliver_booking_alert(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return self._checked(await self.sms.send_booking_alert(payload))
+
+    def _checked(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        # Unconfigured Twilio is not worth retrying; a failed send is
+        if not self.sms.enabled:
+            return result
+        if not result.get("success"):
+            raise RuntimeError(result.get("error", "SMS send failed"))
+        return result
@@ -0,0 +1,247 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import logging
+
+from services.job_queue import JobQueue
+from services.checkout_status import snapshot_from_transaction, TERMINAL_PAYMENT_STATUSES
+
+logger = logging.getLogger(__name__)
+
+APPLY_PAYMENT = "payment.apply"
+
+# Appointment fields the booking alert and slot confirmation need
+ALERT_PROJECTION = {
+    "patientInfo": 1,
+    "serviceName": 1,
+    "appointmentDate": 1,
+    "appointmentTime": 1,
+    "timezone": 1,
+    "serviceId": 1
+}
+
+# Checkout status implied by each webhook event type
+EVENT_CHECKOUT_STATUS = {
+    "checkout.session.completed": "complete",
+    "checkout.session.async_payment_succeeded": "complete",
+    "checkout.session.async_payment_failed": "complete",
+    "checkout.session.expired": "expired",
+}
+
+
+class PaymentEventProcessor:
+    """
+    Single place where payment state changes are applied.
+
+    Stripe webhook deliveries are recorded once in stripe_webhook_events
+    (unique eventId) and acknowledged; the payment -> appointment
+    ('scheduled') -> slot confirmation -> SMS transitions then run on a
+    background queue with retries. Status polls that learn of a change
+    from Stripe hand it to the same queue instead of writing themselves.
+    """
+
+    def __init__(self, database, slot_reservations, notifications, status_cache=None):
+        self.db = database
+        self.slot_reservations = slot_reservations
+        self.notifications = notifications
+        self.status_cache = status_cache
+        self.queue = JobQueue(
+            database,
+            "payment_jobs",
+            workers=int(os.getenv("PAYMENT_EVENT_WORKERS", "2")),
+            max_attempts=int(os.getenv("PAYMENT_EVENT_MAX_ATTEMPTS", "8")),
+            backoff_seconds=2.0
+        )
+        self.queue.register(APPLY_PAYMENT, self._apply_job)
+
+    async def start(self):
+        await self.queue.start()
+        await self.recover()
+
+    async def stop(self):
+        await self.queue.stop()
+
+    async def record_webhook(self, webhook_response: Any) -> Dict[str, Any]:
+        """
+        Store a verified webhook event and queue it, once per event id
+
+        Returns:
+            {"success": True, "duplicate": bool}
+        """
+        event_id = getattr(webhook_response, "event_id", None)
+        session_id = getattr(webhook_response, "session_id", None)
+        event = {
+            "eventId": event_id,
+            "eventType": getattr(webhook_response, "event_type", None),
+            "sessionId": session_id,
+            "paymentStatus": getattr(webhook_response, "payment_status", None),
+            "status": "received",
+            "receivedAt": datetime.utcnow()
+        }
+        if not event_id:
+            # Nothing to deduplicate on - process it, but do not record it
+            if session_id:
+                await self._enqueue(event)
+            return {"success": True, "duplicate": False}
+
+        try:
+            await self.db.stripe_webhook_events.insert_one(event)
+        except DuplicateKeyError:
+            existing = await self.db.stripe_webhook_events.find_one({"eventId": event_id}, {"status": 1})
+            # Stripe redelivers when queueing failed after the insert; the job's
+            # event dedupe key makes queueing it again a no-op otherwise
+            if session_id and existing and existing.get("status") == "received":
+                await self._enqueue(event)
+            return {"success": True, "duplicate": True}
+
+        if session_id:
+            await self._enqueue(event)
+        else:
+            await self._mark_event(event_id, "ignored")
+        return {"success": True, "duplicate": False}
+
+    async def submit_status(self, session_id: str, status: Optional[str], payment_status: Optional[str]):
+        """Queue a status change observed by polling Stripe"""
+        await self._enqueue_change(session_id, payment_status, status)
+
+    async def recover(self):
+        """Queue events that were recorded but never queued (e.g. crash right after the insert)"""
+        cutoff = datetime.utcnow() - timedelta(minutes=1)
+        recovered = 0
+        async for event in self.db.stripe_webhook_events.find(
+            {"status": "received", "receivedAt": {"$lt": cutoff}, "sessionId": {"$ne": None}}
+        ):
+            await self._enqueue(event)
+            recovered += 1
+        if recovered:
+            logger.info(f"Re-queued {recovered} unprocessed Stripe webhook events")
+
+    async def _enqueue(self, event: Dict[str, Any]):
+        """Queue a webhook event document"""
+        await self._enqueue_change(
+            event["sessionId"],
+            event.get("paymentStatus"),
+            EVENT_CHECKOUT_STATUS.get(event.get("eventType")),
+            event.get("eventId")
+        )
+
+    async def _enqueue_change(
+        self,
+        session_id: str,
+        payment_status: Optional[str],
+        checkout_status: Optional[str],
+        event_id: Optional[str] = None
+    ):
+        if event_id:
+            dedupe_key = f"event:{event_id}"
+        else:
+            dedupe_key = f"poll:{session_id}:{checkout_status}:{payment_status}"
+        await self.queue.enqueue(
+            APPLY_PAYMENT,
+            {
+                "eventId": event_id,
+                "sessionId": session_id,
+                "status": checkout_status,
+                "paymentStatus": payment_status
+            },
+            dedupe_key=dedupe_key
+        )
+
+    async def _mark_event(self, event_id: Optional[str], status: str):
+        if event_id:
+            await self.db.stripe_webhook_events.update_one(
+                {"eventId": event_id},
+                {"$set": {"status": status, "processedAt": datetime.utcnow()}}
+            )
+
+    async def _apply_job(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self.apply(
+            payload["sessionId"],
+            payload.get("paymentStatus"),
+            payload.get("status"),
+            payload.get("eventId")
+        )
+        await self._mark_event(payload.get("eventId"), "processed")
+        return result
+
+    async def apply(
+        self,
+        session_id: str,
+        payment_status: Optional[str],
+        checkout_status: Optional[str],
+        event_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Apply a payment status to the transaction and its appointment
+
+        Safe to run more than once for the same change: every step is
+        conditional on the state it moves from or idempotent.
+        """
+        update = {"updatedAt": datetime.utcnow()}
+        if payment_status:
+            update["paymentStatus"] = payment_status
+        if checkout_status:
+            update["status"] = checkout_status
+        if event_id:
+            update["lastEventId"] = event_id
+
+        # A late 'unpaid' must not overwrite a recorded 'paid'
+        query = {"sessionId": session_id}
+        if payment_status not in TERMINAL_PAYMENT_STATUSES:
+            query["paymentStatus"] = {"$nin": list(TERMINAL_PAYMENT_STATUSES)}
+
+        payment = await self.db.payment_transactions.find_one_and_update(
+            query,
+            {"$set": update},
+            return_document=ReturnDocument.AFTER
+        )
+        if not payment:
+            logger.info(f"Payment event for {session_id} ignored (unknown or already final)")
+            return {"success": True, "applied": False}
+
+        if payment.get("paymentStatus") == "paid":
+            await self._schedule_appointment(payment)
+
+        if self.status_cache is not None and (
+            payment.get("paymentStatus") in TERMINAL_PAYMENT_STATUSES or payment.get("status") == "expired"
+        ):
+            self.status_cache.mark_terminal(session_id, snapshot_from_transaction(payment))
+
+        return {"success": True, "applied": True, "paymentStatus": payment.get("paymentStatus")}
+
+    async def _schedule_appointment(self, payment: Dict[str, Any]):
+        """
+        Move the paid booking to 'scheduled' in one write that returns the
+        post-image, which feeds the slot confirmation and the SMS directly.
+
+        'scheduled' is accepted as a starting state so a retried job still
+        finishes the later steps; cancelled bookings are never revived.
+        """
+        appointment = await self.db.appointments.find_one_and_update(
+            {**self._appointment_query(payment), "status": {"$in": ["pending_payment", "scheduled"]}},
+            {"$set": {
+                "paymentStatus": "paid",
+                "status": "scheduled",
+                "updatedAt": datetime.utcnow()
+            }},
+            projection=ALERT_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+        if not appointment:
+            logger.info(f"No open appointment for paid session {payment['sessionId']}")
+            return
+
+        # Paid bookings keep their slot - drop the hold expiry
+        await self.slot_reservations.confirm(str(appointment["_id"]), appointment)
+        await self.notifications.enqueue_booking_alert(appointment)
+
+    @staticmethod
+    def _appointment_query(payment: Dict[str, Any]) -> Dict[str, Any]:
+        appointment_id = payment.get("appointmentId")
+        if appointment_id:
+            return {"_id": ObjectId(appointment_id) if ObjectId.is_valid(appointment_id) else appointment_id}
+        # Appointments booked after checkout carry the session id instead
+        return {"paymentSessionId": payment["sessionId"]}
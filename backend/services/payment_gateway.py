@@ -0,0 +1,71 @@
+import os
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict
+import logging
+
+from emergentintegrations.payments.stripe.checkout import StripeCheckout
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = "/api/webhook/stripe"
+
+
+class PaymentGateway:
+    """
+    Per-process Stripe access shared by the payment routes.
+
+    StripeCheckout instances are created once per webhook URL and reused,
+    and Stripe API calls go through one pooled keep-alive HTTP session, so
+    a checkout does not pay client setup and a TLS handshake each time.
+    """
+
+    def __init__(self):
+        self.api_key = os.getenv("STRIPE_API_KEY", "sk_test_emergent")
+        # Public backend URL; when unset each request's own base URL is used
+        self.webhook_url = self._webhook_url(os.getenv("STRIPE_WEBHOOK_BASE_URL"))
+        self.max_connections = int(os.getenv("STRIPE_MAX_CONNECTIONS", "20"))
+        self.timeout = float(os.getenv("STRIPE_TIMEOUT_SECONDS", "30"))
+
+        self._checkouts: Dict[str, StripeCheckout] = {}
+        self._session: Optional[requests.Session] = None
+
+    @staticmethod
+    def _webhook_url(base_url: Optional[str]) -> Optional[str]:
+        if not base_url:
+            return None
+        return f"{base_url.rstrip('/')}{WEBHOOK_PATH}"
+
+    async def start(self):
+        """Install the pooled Stripe HTTP client (called on app startup)"""
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+            session.mount("https://", adapter)
+            self._session = session
+            stripe.default_http_client = stripe.RequestsClient(timeout=self.timeout, session=session)
+        if self.webhook_url:
+            self.checkout()
+
+    async def stop(self):
+        """Close pooled connections (called on app shutdown)"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        self._checkouts.clear()
+
+    def checkout(self, base_url: Optional[str] = None) -> StripeCheckout:
+        """
+        Shared StripeCheckout for this deployment
+
+        Args:
+            base_url: Request base URL, used only when STRIPE_WEBHOOK_BASE_URL is unset
+        """
+        webhook_url = self.webhook_url or self._webhook_url(base_url) or ""
+        checkout = self._checkouts.get(webhook_url)
+        if checkout is None:
+            checkout = StripeCheckout(api_key=self.api_key, webhook_url=webhook_url)
+            self._checkouts[webhook_url] = checkout
+            logger.info(f"Stripe checkout client created for webhook {webhook_url or '(none)'}")
+        return checkout
@@ -3,7 +3,7 @@ import base64
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterator
 import logging
 
 logger = logging.getLogger(__name__)
@@ -116,32 +116,7 @@ class PhotoUploadService:
             List of photo metadata
         """
         try:
-            photos = []
-            
-            # Determine which directories to search
-            if photo_category:
-                search_dirs = {photo_category: self.photo_dirs[photo_category]}
-            else:
-                search_dirs = self.photo_dirs
-            
-            # Search for patient photos
-            for category, dir_path in search_dirs.items():
-                if dir_path.exists():
-                    for file_path in dir_path.glob(f"{patient_id}_*"):
-                        # Parse filename for metadata
-                        parts = file_path.stem.split("_")
-                        
-                        photos.append({
-                            "filename": file_path.name,
-                            "file_path": str(file_path),
-                            "category": category,
-                            "photo_type": parts[1] if len(parts) > 1 else "unknown",
-                            "timestamp": parts[2] if len(parts) > 2 else "unknown",
-                            "file_size": file_path.stat().st_size,
-                            "uploaded_at": datetime.fromtimestamp(
-                                file_path.stat().st_ctime
-                            ).isoformat()
-                        })
+            photos = list(self.iter_patient_photos(patient_id, photo_category))
             
             return {
                 "success": True,
@@ -157,6 +132,60 @@ class PhotoUploadService:
                 "error": str(e)
             }
     
+    def _search_dirs(self, photo_category: Optional[str] = None) -> Dict[str, Path]:
+        """Directories to search, optionally limited to one category"""
+        if photo_category:
+            return {photo_category: self.photo_dirs[photo_category]}
+        return self.photo_dirs
+    
+    def check_photo_dirs(self, photo_category: Optional[str] = None):
+        """
+        Make sure the photo directories can be listed before streaming from them
+        
+        Raises:
+            OSError: if a directory exists but cannot be read
+            KeyError: for an unknown photo_category
+        """
+        for dir_path in self._search_dirs(photo_category).values():
+            if dir_path.exists():
+                with os.scandir(dir_path):
+                    pass
+    
+    def iter_patient_photos(
+        self,
+        patient_id: str,
+        photo_category: Optional[str] = None
+    ) -> Iterator[Dict]:
+        """
+        Yield photo metadata for a patient one file at a time (blocking file system walk)
+        
+        Args:
+            patient_id: Patient identifier
+            photo_category: Optional filter (medications, insurance, identification)
+        """
+        # Search for patient photos
+        for category, dir_path in self._search_dirs(photo_category).items():
+            if dir_path.exists():
+                for file_path in dir_path.glob(f"{patient_id}_*"):
+                    # Parse filename for metadata
+                    parts = file_path.stem.split("_")
+                    try:
+                        stat = file_path.stat()
+                    except OSError as e:
+                        # Deleted between the listing and the stat
+                        logger.warning(f"Skipping photo {file_path}: {str(e)}")
+                        continue
+                    
+                    yield {
+                        "filename": file_path.name,
+                        "file_path": str(file_path),
+                        "category": category,
+                        "photo_type": parts[1] if len(parts) > 1 else "unknown",
+                        "timestamp": parts[2] if len(parts) > 2 else "unknown",
+                        "file_size": stat.st_size,
+                        "uploaded_at": datetime.fromtimestamp(stat.st_ctime).isoformat()
+                    }
+    
     async def delete_photo(self, file_path: str) -> Dict:
         """Delete a photo file"""
         try:
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one.
+
+    The first caller for a key runs the call; callers arriving while it is
+    in flight wait for and share its result or exception. Nothing is kept
+    once the call finishes, so this is not a cache by itself.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Callers answered by another caller's call
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Result of `call()`, shared with concurrent callers for `key`
+
+        Args:
+            key: Identifies calls that may share a result
+            call: Started only if no call for `key` is in flight
+        """
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            # A waiter being cancelled must not cancel the shared call
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await call()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters see the error; keep it from being reported as unretrieved
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
@@ -0,0 +1,193 @@
+import numpy as np
+from datetime import datetime, date, timedelta, timezone
+from zoneinfo import ZoneInfo
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+
+from config import GUAM_SERVICE_HOURS_CHST, SLOT_INCREMENT_MINUTES
+
+logger = logging.getLogger(__name__)
+
+EPOCH = date(1970, 1, 1)
+MINUTES_PER_DAY = 24 * 60
+
+# '12:00 AM' ... '11:59 PM' indexed by minute of day - the appointmentTime format
+TIME_LABELS = np.array([
+    datetime(2000, 1, 1, minute // 60, minute % 60).strftime("%I:%M %p")
+    for minute in range(MINUTES_PER_DAY)
+])
+
+
+def _utc_offset_minutes(tz: Any, epoch_minute: int) -> int:
+    moment = datetime.fromtimestamp(epoch_minute * 60, tz=timezone.utc).astimezone(tz)
+    return int(moment.utcoffset().total_seconds() // 60)
+
+
+@lru_cache(maxsize=64)
+def _offset_table(tz_name: str, start_hour: int, end_hour: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Step function of a timezone's UTC offset over [start_hour, end_hour]
+    (epoch hours), as (change_minutes, offset_minutes) arrays.
+
+    The offset is probed hourly and each change is narrowed to the exact
+    minute, so DST transitions are honoured without a per-slot tz lookup.
+    """
+    tz = ZoneInfo(tz_name)
+    change_minutes = [start_hour * 60]
+    offsets = [_utc_offset_minutes(tz, start_hour * 60)]
+    for hour in range(start_hour + 1, end_hour + 1):
+        offset = _utc_offset_minutes(tz, hour * 60)
+        if offset == offsets[-1]:
+            continue
+        low, high = (hour - 1) * 60, hour * 60
+        while high - low > 1:
+            mid = (low + high) // 2
+            if _utc_offset_minutes(tz, mid) == offsets[-1]:
+                low = mid
+            else:
+                high = mid
+        change_minutes.append(high)
+        offsets.append(offset)
+    return np.array(change_minutes, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+
+class SlotEngine:
+    """
+    Precomputed appointment slot grids as integer minute arrays.
+
+    Slot starts are UTC minutes since the epoch for each provider-local day
+    inside GUAM_SERVICE_HOURS_CHST. Day grids are cached per visit duration,
+    and conversion to a region's local time, overlap filtering and label
+    formatting are all vectorized, so a month of slots for every region is
+    generated without per-slot datetime work.
+    """
+
+    def __init__(self, service_hours: Optional[Dict[str, Any]] = None, increment_minutes: Optional[int] = None):
+        service_hours = service_hours or GUAM_SERVICE_HOURS_CHST
+        self.provider_tz_name = service_hours["timezone"]
+        self.provider_tz = ZoneInfo(self.provider_tz_name)
+        self.open_minute = service_hours["start"] * 60
+        self.close_minute = service_hours["end"] * 60
+        self.increment = increment_minutes or SLOT_INCREMENT_MINUTES
+        self._day_grids: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def day_offsets(self, duration_minutes: int) -> np.ndarray:
+        """Provider-local minute of day for every slot start of a given length"""
+        return np.arange(
+            self.open_minute,
+            self.close_minute - duration_minutes + 1,
+            self.increment,
+            dtype=np.int64
+        )
+
+    def day_grid(self, day: date, duration_minutes: int) -> np.ndarray:
+        """UTC epoch minutes of the slot starts on one provider-local day"""
+        key = (day.toordinal(), duration_minutes)
+        grid = self._day_grids.get(key)
+        if grid is not None:
+            return grid
+
+        offsets = self.day_offsets(duration_minutes)
+        wall = (day - EPOCH).days * MINUTES_PER_DAY + offsets
+        opening = datetime(day.year, day.month, day.day, tzinfo=self.provider_tz)
+        open_offset = opening + timedelta(minutes=self.open_minute)
+        close_offset = opening + timedelta(minutes=self.close_minute)
+        if open_offset.utcoffset() == close_offset.utcoffset():
+            grid = wall - int(open_offset.utcoffset().total_seconds() // 60)
+        else:
+            # DST change inside service hours - resolve each slot individually
+            grid = np.array([
+                int((opening + timedelta(minutes=int(minute))).timestamp() // 60)
+                for minute in offsets
+            ], dtype=np.int64)
+
+        if len(self._day_grids) > 4096:
+            self._day_grids.clear()
+        self._day_grids[key] = grid
+        return grid
+
+    def grid(self, start_day: date, end_day: date, duration_minutes: int) -> np.ndarray:
+        """UTC epoch minutes of every slot start across provider-local days (inclusive)"""
+        days = (end_day - start_day).days + 1
+        if days <= 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([
+            self.day_grid(start_day + timedelta(days=i), duration_minutes) for i in range(days)
+        ])
+
+    def grid_between(self, window_start: datetime, window_end: datetime, duration_minutes: int) -> np.ndarray:
+        """Slot starts (UTC epoch minutes) with window_start <= start < window_end"""
+        grid = self.grid(
+            window_start.astimezone(self.provider_tz).date(),
+            window_end.astimezone(self.provider_tz).date(),
+            duration_minutes
+        )
+        start_minute = int(np.ceil(window_start.timestamp() / 60))
+        end_minute = int(np.ceil(window_end.timestamp() / 60))
+        return grid[(grid >= start_minute) & (grid < end_minute)]
+
+    def contains(self, start: datetime, duration_minutes: int) -> bool:
+        """True if a slot of this length starting at `start` lies within service hours"""
+        local = start.astimezone(self.provider_tz)
+        minute_of_day = local.hour * 60 + local.minute
+        return self.open_minute <= minute_of_day and minute_of_day + duration_minutes <= self.close_minute
+
+    @staticmethod
+    def open_mask(
+        slot_minutes: np.ndarray,
+        duration_minutes: int,
+        busy_starts: Sequence[float],
+        busy_ends: Sequence[float]
+    ) -> np.ndarray:
+        """
+        Boolean mask of slots that overlap no busy block
+
+        Busy blocks must be sorted and disjoint (epoch seconds); each slot
+        is tested with one vectorized binary search.
+        """
+        if len(busy_starts) == 0:
+            return np.ones(len(slot_minutes), dtype=bool)
+        starts = np.asarray(busy_starts, dtype=np.float64)
+        ends = np.asarray(busy_ends, dtype=np.float64)
+        slot_seconds = slot_minutes.astype(np.float64) * 60
+        # First busy block ending after each slot starts
+        first = np.searchsorted(ends, slot_seconds, side="right")
+        has_next = first < len(starts)
+        overlaps = has_next & (starts[np.minimum(first, len(starts) - 1)] < slot_seconds + duration_minutes * 60)
+        return ~overlaps
+
+    @staticmethod
+    def to_local(slot_minutes: np.ndarray, tz_name: str) -> np.ndarray:
+        """Convert UTC epoch minutes to wall-clock epoch minutes in a timezone (DST aware)"""
+        if len(slot_minutes) == 0:
+            return slot_minutes
+        change_minutes, offsets = _offset_table(
+            tz_name,
+            int(slot_minutes.min() // 60) - 1,
+            int(slot_minutes.max() // 60) + 1
+        )
+        index = np.searchsorted(change_minutes, slot_minutes, side="right") - 1
+        return slot_minutes + offsets[index]
+
+    @staticmethod
+    def format_local(local_minutes: np.ndarray) -> Tuple[List[str], List[str]]:
+        """Wall-clock epoch minutes to ('YYYY-MM-DD', '08:00 AM') string lists"""
+        dates = np.datetime_as_string(
+            (local_minutes // MINUTES_PER_DAY).astype("datetime64[D]"), unit="D"
+        )
+        times = TIME_LABELS[local_minutes % MINUTES_PER_DAY]
+        return dates.tolist(), times.tolist()
+
+    def region_slots(self, slot_minutes: np.ndarray, tz_name: str) -> List[Dict[str, str]]:
+        """Slot dictionaries in a region's local date/time plus the UTC start"""
+        dates, times = self.format_local(self.to_local(slot_minutes, tz_name))
+        utc = np.datetime_as_string(slot_minutes.astype("datetime64[m]"), unit="s").tolist()
+        return [
+            {"date": d, "time": t, "start": f"{u}+00:00"}
+            for d, t, u in zip(dates, times, utc)
+        ]
+
+
+# Shared instance used by the availability and booking routes
+slot_engine = SlotEngine()
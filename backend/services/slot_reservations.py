@@ -0,0 +1,282 @@
+import asyncio
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from pymongo.errors import DuplicateKeyError
+import logging
+
+from config import DEFAULT_PROVIDER_ID, SLOT_HOLD_MINUTES
+from services.availability import resolve_visit_duration, DEFAULT_VISIT_MINUTES
+
+logger = logging.getLogger(__name__)
+
+# Time formats accepted from the booking UI ('08:00 AM') and API clients ('08:00')
+TIME_FORMATS = ("%I:%M %p", "%H:%M")
+
+
+def parse_local_slot(date: str, time: str, timezone: str) -> datetime:
+    """
+    Parse a patient-local date ('YYYY-MM-DD') and time ('08:00 AM') into
+    an aware UTC datetime
+
+    Raises:
+        ValueError: if the date, time or timezone cannot be parsed
+    """
+    for time_format in TIME_FORMATS:
+        try:
+            local = datetime.strptime(f"{date} {time.strip().upper()}", f"%Y-%m-%d {time_format}")
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"Unrecognized appointment time: {time}")
+
+    try:
+        tz = ZoneInfo(timezone)
+    except Exception:
+        raise ValueError(f"Unrecognized timezone: {timezone}")
+
+    return local.replace(tzinfo=tz).astimezone(dt_timezone.utc)
+
+
+def normalize_slot(date: str, time: str, timezone: str) -> Tuple[str, str]:
+    """
+    Convert a patient-local date/time to the UTC date and 24h time used as
+    the reservation key, so the same instant booked from two timezones
+    collides on the unique index.
+
+    Raises:
+        ValueError: if the date, time or timezone cannot be parsed
+    """
+    start_utc = parse_local_slot(date, time, timezone)
+    return start_utc.strftime("%Y-%m-%d"), start_utc.strftime("%H:%M")
+
+
+class SlotReservationService:
+    """
+    Provider slot reservations backed by a unique (providerId, date, time)
+    index. Reserving is a single insert that either wins the slot or fails
+    with a duplicate key error; unpaid holds carry an expiresAt that the
+    TTL index uses to release abandoned bookings.
+    """
+
+    HELD = "held"
+    CONFIRMED = "confirmed"
+
+    def __init__(self, database, provider_id: Optional[str] = None, hold_minutes: Optional[int] = None):
+        self.collection = database.slot_reservations
+        self.provider_id = provider_id or DEFAULT_PROVIDER_ID
+        self.hold_minutes = hold_minutes if hold_minutes is not None else SLOT_HOLD_MINUTES
+
+    def _reservation_doc(
+        self,
+        appointment_id: str,
+        date: str,
+        time: str,
+        timezone: str,
+        confirmed: bool,
+        duration_minutes: Optional[int]
+    ) -> Dict[str, Any]:
+        slot_date, slot_time = normalize_slot(date, time, timezone)
+        now = datetime.utcnow()
+        doc = {
+            "providerId": self.provider_id,
+            "date": slot_date,
+            "time": slot_time,
+            "durationMinutes": duration_minutes,
+            "appointmentId": appointment_id,
+            "status": self.CONFIRMED if confirmed else self.HELD,
+            "createdAt": now
+        }
+        if not confirmed:
+            doc["expiresAt"] = now + timedelta(minutes=self.hold_minutes)
+        return doc
+
+    async def reserve(
+        self,
+        appointment_id: str,
+        date: str,
+        time: str,
+        timezone: str,
+        confirmed: bool = False,
+        duration_minutes: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Atomically claim a slot for an appointment
+
+        Args:
+            appointment_id: Appointment the slot is held for
+            date: Patient-local date (YYYY-MM-DD)
+            time: Patient-local time ('08:00 AM')
+            timezone: Patient IANA timezone
+            confirmed: Reserve without a hold expiry (paid/scheduled appointments)
+            duration_minutes: Visit length, used by availability searches
+
+        Returns:
+            Result dictionary with success status and the reservation
+        """
+        try:
+            doc = self._reservation_doc(appointment_id, date, time, timezone, confirmed, duration_minutes)
+        except ValueError as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+        try:
+            await self.collection.insert_one(doc)
+        except DuplicateKeyError:
+            return {
+                "success": False,
+                "error": "This time slot is already booked. Please select a different time."
+            }
+
+        return {
+            "success": True,
+            "reservation": doc
+        }
+
+    async def confirm(self, appointment_id: str, appointment: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Turn a hold into a permanent reservation once payment succeeds
+
+        Args:
+            appointment_id: Appointment whose slot to confirm
+            appointment: Appointment document (appointmentDate, appointmentTime,
+                timezone, serviceId); if the hold already expired, the slot is
+                reserved again from it when still free
+
+        Returns:
+            True if the appointment holds a confirmed reservation
+        """
+        result = await self.collection.update_many(
+            {"appointmentId": appointment_id},
+            {"$set": {"status": self.CONFIRMED}, "$unset": {"expiresAt": ""}}
+        )
+        if result.matched_count > 0:
+            return True
+
+        if appointment is None:
+            logger.warning(f"No slot reservation found to confirm for appointment {appointment_id}")
+            return False
+
+        reservation = await self.reserve(
+            appointment_id,
+            appointment.get("appointmentDate") or "",
+            appointment.get("appointmentTime") or "",
+            appointment.get("timezone") or "",
+            confirmed=True,
+            duration_minutes=resolve_visit_duration(appointment.get("serviceId")) or DEFAULT_VISIT_MINUTES
+        )
+        if not reservation.get("success"):
+            logger.error(f"Could not re-reserve expired slot for appointment {appointment_id}: {reservation.get('error')}")
+            return False
+        logger.info(f"Re-reserved expired slot for appointment {appointment_id}")
+        return True
+
+    async def release(self, appointment_id: str, keep_id=None) -> int:
+        """Free every slot held by an appointment (optionally except one)"""
+        query = {"appointmentId": appointment_id}
+        if keep_id is not None:
+            query["_id"] = {"$ne": keep_id}
+        result = await self.collection.delete_many(query)
+        return result.deleted_count
+
+    async def reschedule(
+        self,
+        appointment_id: str,
+        date: str,
+        time: str,
+        timezone: str,
+        confirmed: bool = False,
+        duration_minutes: Optional[int] = None,
+        conflict_check: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Claim the new slot first, then release the old one
+
+        Args:
+            conflict_check: Run once the new slot is reserved; returning True
+                gives the new slot back and keeps the old one. Checking after
+                the insert means two concurrent overlapping moves cannot
+                both miss each other.
+        """
+        result = await self.reserve(
+            appointment_id, date, time, timezone, confirmed=confirmed, duration_minutes=duration_minutes
+        )
+        if not result.get("success"):
+            return result
+
+        new_id = result["reservation"]["_id"]
+        if conflict_check is not None and await conflict_check():
+            await self.collection.delete_one({"_id": new_id})
+            return {
+                "success": False,
+                "error": "This time overlaps another appointment. Please select a different time."
+            }
+
+        await self.release(appointment_id, keep_id=new_id)
+        return result
+
+
+async def backfill_slot_reservations(
+    database,
+    reservations: SlotReservationService,
+    batch_size: int = 500,
+    pause_seconds: float = 0.1
+) -> int:
+    """
+    Reserve slots for upcoming appointments booked before slot_reservations existed.
+
+    Scheduled appointments get confirmed reservations and pending_payment ones
+    a fresh hold. Appointments that already hold a reservation are skipped,
+    so this is safe to run on every startup. Two legacy bookings for the same
+    slot are logged; the scheduled (then older) one keeps the slot. Run after
+    backfill_appointment_times, which sets the startUtc used to find them.
+
+    Returns:
+        Number of reservations created
+    """
+    created = 0
+    now = datetime.utcnow()
+    # Paid bookings first, so they win a slot that a legacy unpaid booking also claims
+    for status in ("scheduled", "pending_payment"):
+        last_id = None
+        while True:
+            query: Dict[str, Any] = {"status": status, "startUtc": {"$gte": now}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = await database.appointments.find(
+                query,
+                {"appointmentDate": 1, "appointmentTime": 1, "timezone": 1, "serviceId": 1}
+            ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+
+            reserved = set(await database.slot_reservations.distinct(
+                "appointmentId", {"appointmentId": {"$in": [str(appointment["_id"]) for appointment in batch]}}
+            ))
+            for appointment in batch:
+                appointment_id = str(appointment["_id"])
+                if appointment_id in reserved:
+                    continue
+                result = await reservations.reserve(
+                    appointment_id,
+                    appointment.get("appointmentDate") or "",
+                    appointment.get("appointmentTime") or "",
+                    appointment.get("timezone") or "",
+                    confirmed=status == "scheduled",
+                    duration_minutes=resolve_visit_duration(appointment.get("serviceId")) or DEFAULT_VISIT_MINUTES
+                )
+                if result.get("success"):
+                    created += 1
+                else:
+                    logger.warning(f"Cannot reserve slot for {status} appointment {appointment_id}: {result.get('error')}")
+
+            logger.info(f"Slot reservation backfill: {created} created so far")
+            await asyncio.sleep(pause_seconds)
+
+    if created:
+        logger.info(f"Slot reservation backfill complete: {created} reservations created")
+    return created
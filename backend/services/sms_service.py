@@ -1,8 +1,11 @@
 import os
+import asyncio
 from twilio.rest import Client
 from typing import Optional
 import logging
 
+from metrics import track_dependency
+
 logger = logging.getLogger(__name__)
 
 class SMSService:
@@ -41,12 +44,14 @@ class SMSService:
             # Format message
             message_body = self._format_booking_message(appointment_data)
             
-            # Send SMS
-            message = self.client.messages.create(
-                body=message_body,
-                from_=self.from_number,
-                to=self.alert_number
-            )
+            # Send SMS (the Twilio client is blocking - keep it off the event loop)
+            async with track_dependency("twilio", "messages.create"):
+                message = await asyncio.to_thread(
+                    self.client.messages.create,
+                    body=message_body,
+                    from_=self.from_number,
+                    to=self.alert_number
+                )
             
             logger.info(f"SMS sent successfully. SID: {message.sid}")
             
@@ -106,11 +111,13 @@ MedRx Telemedicine"""
             }
         
         try:
-            msg = self.client.messages.create(
-                body=message,
-                from_=self.from_number,
-                to=to_number
-            )
+            async with track_dependency("twilio", "messages.create"):
+                msg = await asyncio.to_thread(
+                    self.client.messages.create,
+                    body=message,
+                    from_=self.from_number,
+                    to=to_number
+                )
             
             return {
                 "success": True,
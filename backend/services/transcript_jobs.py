@@ -0,0 +1,150 @@
+import os
+from datetime import datetime
+from typing import Optional, Dict, Any
+from bson import ObjectId
+import logging
+
+from services.job_queue import JobQueue, DONE
+from services.voice_intake import VoiceIntakeService, intake_fields
+
+logger = logging.getLogger(__name__)
+
+EXTRACT_TRANSCRIPT = "voice_intake.extract"
+
+# What a status poll returns - never the transcript in the payload
+JOB_STATUS_PROJECTION = {
+    "status": 1,
+    "attempts": 1,
+    "result": 1,
+    "lastError": 1,
+    "createdAt": 1,
+    "finishedAt": 1
+}
+
+
+async def store_medical_history(
+    database,
+    appointment_id: str,
+    transcript: str,
+    medical_data: Dict[str, Any],
+    formatted_notes: str
+) -> bool:
+    """
+    Save an extraction on its appointment
+
+    Returns:
+        True if an appointment was updated
+    """
+    # Appointments are keyed by ObjectId; fall back to a string id like the intake routes do
+    if ObjectId.is_valid(appointment_id):
+        query = {"_id": ObjectId(appointment_id)}
+    else:
+        query = {"id": appointment_id}
+    result = await database.appointments.update_one(
+        query,
+        {
+            "$set": {
+                "medicalHistory": medical_data.get("data"),
+                "medicalHistoryText": formatted_notes,
+                "voiceTranscript": transcript,
+                "updatedAt": datetime.now().isoformat()
+            }
+        }
+    )
+
+    if result.modified_count == 0:
+        logger.warning(f"Appointment {appointment_id} not found or not updated")
+        return False
+    return True
+
+
+class TranscriptJobService:
+    """
+    Transcript extraction as background jobs.
+
+    The submit endpoint enqueues and returns a job id; workers run the LLM
+    extraction (sharing the voice service's concurrency limit) with retries
+    and write the result to the job and its appointment. Clients poll or
+    long-poll the job for completion.
+    """
+
+    def __init__(self, database, voice_service: Optional[VoiceIntakeService] = None):
+        self.database = database
+        self.voice_service = voice_service or VoiceIntakeService()
+        self.queue = JobQueue(
+            database,
+            "transcript_jobs",
+            workers=int(os.getenv("TRANSCRIPT_WORKERS", str(self.voice_service.max_concurrency))),
+            max_attempts=int(os.getenv("TRANSCRIPT_MAX_ATTEMPTS", "3")),
+            backoff_seconds=float(os.getenv("TRANSCRIPT_BACKOFF_SECONDS", "15")),
+            # Covers queueing behind the LLM limit plus the client's own retries
+            lease_seconds=float(os.getenv("TRANSCRIPT_LEASE_SECONDS", "300"))
+        )
+        self.queue.register(EXTRACT_TRANSCRIPT, self._extract)
+
+    async def start(self):
+        await self.queue.start()
+
+    async def stop(self):
+        await self.queue.stop()
+
+    async def submit(self, transcript: str, appointment_id: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a transcript for extraction"""
+        try:
+            job_id = await self.queue.enqueue(
+                EXTRACT_TRANSCRIPT,
+                {"transcript": transcript, "appointment_id": appointment_id}
+            )
+            return {"success": True, "job_id": job_id}
+        except Exception as e:
+            logger.error(f"Failed to queue transcript: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def status(self, job_id: str, wait_seconds: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        Current state of a job, waiting up to `wait_seconds` for it to finish
+
+        Returns:
+            Job status dictionary, or None for an unknown job id
+        """
+        if wait_seconds > 0:
+            job = await self.queue.wait(job_id, wait_seconds, JOB_STATUS_PROJECTION)
+        else:
+            job = await self.queue.get(job_id, JOB_STATUS_PROJECTION)
+        if job is None:
+            return None
+
+        result = job.get("result") or {}
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "attempts": job.get("attempts", 0),
+            "medical_data": result.get("medical_data"),
+            "formatted_notes": result.get("formatted_notes"),
+            "intake_fields": intake_fields(result.get("medical_data")),
+            "appointment_updated": result.get("appointment_updated"),
+            # Last failed attempt; cleared once a retry succeeds
+            "error": None if job["status"] == DONE else job.get("lastError"),
+            "created_at": job.get("createdAt"),
+            "finished_at": job.get("finishedAt")
+        }
+
+    async def _extract(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        transcript = payload["transcript"]
+        medical_data = await self.voice_service.extract_medical_data(transcript)
+        if not medical_data.get("success"):
+            raise RuntimeError(medical_data.get("error", "Extraction failed"))
+
+        formatted_notes = self.voice_service.format_for_storage(medical_data)
+
+        appointment_updated = None
+        if payload.get("appointment_id"):
+            appointment_updated = await store_medical_history(
+                self.database, payload["appointment_id"], transcript, medical_data, formatted_notes
+            )
+
+        return {
+            "medical_data": medical_data.get("data"),
+            "formatted_notes": formatted_notes,
+            "appointment_updated": appointment_updated
+        }
@@ -0,0 +1,153 @@
+from typing import Any, Dict, List, Optional
+
+# Values the extraction prompt uses for "not provided"
+BLANK_VALUES = {"", "not mentioned", "none", "null", "n/a", "unknown"}
+
+LIST_FIELDS = ("allergies", "chronic_conditions", "concerns")
+WEIGHT_FIELDS = ("current_weight", "current_height", "weight_loss_goals")
+
+
+def split_transcript(transcript: str, segment_chars: int, overlap_chars: int) -> List[str]:
+    """
+    Split a transcript into overlapping segments of about `segment_chars`.
+
+    Segments end at a sentence or line break in their last fifth when there
+    is one (otherwise at whitespace), and each starts `overlap_chars` before
+    the previous one ended, so a statement cut at a boundary appears whole
+    in at least one segment.
+
+    Args:
+        transcript: Full transcript text
+        segment_chars: Target segment length
+        overlap_chars: Characters shared by neighbouring segments
+
+    Returns:
+        Segments in transcript order (the whole transcript if it fits in one)
+    """
+    text = transcript.strip()
+    if len(text) <= segment_chars:
+        return [text]
+
+    segments = []
+    start = 0
+    while start < len(text):
+        end = min(start + segment_chars, len(text))
+        if end < len(text):
+            window_start = end - segment_chars // 5
+            cut = max(text.rfind(mark, window_start, end) for mark in (". ", "? ", "! ", "\n"))
+            if cut < 0:
+                cut = text.rfind(" ", window_start, end)
+            if cut > start:
+                end = cut + 1
+        segments.append(text[start:end].strip())
+        if end >= len(text):
+            break
+
+        next_start = max(end - overlap_chars, start + 1)
+        # Begin the overlap on a word boundary
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space >= 0 else next_start
+    return segments
+
+
+def is_blank(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value.strip().lower() in BLANK_VALUES
+    if isinstance(value, (list, dict)):
+        return not value
+    return False
+
+
+def _key(value: Any) -> str:
+    return " ".join(str(value).lower().split())
+
+
+def _unique(values: List[Any]) -> List[Any]:
+    """Non-blank values with case/whitespace duplicates removed, first spelling kept"""
+    seen = set()
+    unique = []
+    for value in values:
+        if is_blank(value) or _key(value) in seen:
+            continue
+        seen.add(_key(value))
+        unique.append(value)
+    return unique
+
+
+def _as_list(value: Any) -> List[Any]:
+    if isinstance(value, list):
+        return value
+    return [] if is_blank(value) else [value]
+
+
+def _merge_medications(segments: List[Dict[str, Any]]) -> List[Any]:
+    merged: Dict[str, Any] = {}
+    for data in segments:
+        for med in _as_list(data.get("medications")):
+            if not isinstance(med, dict):
+                med = {"name": med}
+            if is_blank(med.get("name")):
+                continue
+            key = _key(med["name"])
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = dict(med)
+            else:
+                # Segments mentioning a medication again may add its dosage or frequency
+                for field, value in med.items():
+                    if is_blank(existing.get(field)) and not is_blank(value):
+                        existing[field] = value
+    return list(merged.values())
+
+
+def merge_extractions(segments: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine per-segment extractions into one document in the single-pass format.
+
+    Medications are merged by name, list fields are deduplicated
+    case-insensitively, and for weight values the last segment that states
+    one wins (later in a visit is usually a correction). Segments the model
+    did not return JSON for are kept under raw_extraction.
+
+    Args:
+        segments: Parsed extraction per segment, in transcript order
+    """
+    parsed = [data for data in segments if "raw_extraction" not in data]
+    unparsed = [data["raw_extraction"] for data in segments if "raw_extraction" in data]
+
+    merged: Dict[str, Any] = {"medications": _merge_medications(parsed)}
+    for field in LIST_FIELDS:
+        merged[field] = _unique([value for data in parsed for value in _as_list(data.get(field))])
+
+    weight_history: Dict[str, Any] = {}
+    attempts: List[Any] = []
+    for data in parsed:
+        history = data.get("weight_history")
+        if not isinstance(history, dict):
+            continue
+        for field in WEIGHT_FIELDS:
+            if not is_blank(history.get(field)):
+                weight_history[field] = history[field]
+        attempts.extend(_as_list(history.get("previous_attempts")))
+    weight_history["previous_attempts"] = _unique(attempts)
+    merged["weight_history"] = weight_history
+
+    notes = _unique([data.get("additional_notes") for data in parsed])
+    merged["additional_notes"] = "\n".join(str(note) for note in notes) if notes else None
+
+    if unparsed:
+        merged["raw_extraction"] = "\n\n".join(unparsed)
+        merged["error"] = f"Could not parse {len(unparsed)} of {len(segments)} segments as JSON"
+    return merged
+
+
+def segment_note(index: int, total: int) -> Optional[str]:
+    """Prompt preamble telling the model it sees one part of a longer transcript"""
+    if total <= 1:
+        return None
+    return (
+        f"This is part {index + 1} of {total} of a longer transcript; neighbouring parts overlap slightly. "
+        "Extract only what this part mentions."
+    )
@@ -1,27 +1,23 @@
 import os
 import json
-from anthropic import Anthropic
-from typing import Dict, Any
+import asyncio
+import logging
+from anthropic import AsyncAnthropic
+from typing import Dict, Any, List, Optional
+from pydantic import ValidationError
 
-class VoiceIntakeService:
-    """Service for processing voice transcriptions and extracting medical data"""
-    
-    def __init__(self):
-        self.llm_key = os.getenv("EMERGENT_LLM_KEY")
-        self.anthropic_client = Anthropic(api_key=self.llm_key)
-    
-    async def extract_medical_data(self, transcript: str) -> Dict[str, Any]:
-        """
-        Extract structured medical data from voice transcription using Claude Sonnet-4
-        
-        Args:
-            transcript: Raw transcription text from Deepgram
-            
-        Returns:
-            Structured medical data as dictionary
-        """
-        
-        system_prompt = """You are a medical data extraction assistant. 
+from metrics import track_dependency, LLM_REQUESTS_WAITING, LLM_REQUESTS_IN_FLIGHT
+from services.extraction_cache import ExtractionCache, extraction_key
+from services.transcript_segments import split_transcript, merge_extractions, segment_note
+from models import ExtractedMedicalData
+
+logger = logging.getLogger(__name__)
+
+MODEL = "claude-sonnet-4-20250514"
+# Bump whenever the extraction prompts or output format change, so cached results are not reused
+PROMPT_VERSION = "3"
+
+SYSTEM_PROMPT = """You are a medical data extraction assistant. 
 Your job is to extract structured medical information from patient voice transcriptions.
 
 Extract the following information when available:
@@ -37,7 +33,8 @@ Format the response as a structured JSON object with clear sections.
 If information is not provided, mark as "Not mentioned" or null.
 """
 
-        user_prompt = f"""Extract medical information from this patient transcript:
+# str.format template; {transcript} is the transcript or segment
+USER_PROMPT = """Extract medical information from this patient transcript:
 
 {transcript}
 
@@ -59,36 +56,170 @@ Provide a structured JSON response with the following format:
 }}
 """
 
+# The model must answer by calling this tool, so its output is JSON matching ExtractedMedicalData
+EXTRACTION_TOOL = {
+    "name": "record_medical_data",
+    "description": "Record the medical information extracted from the transcript",
+    "input_schema": ExtractedMedicalData.model_json_schema()
+}
+
+# Opening braces tried before giving up on a text response
+MAX_JSON_CANDIDATES = 3
+
+_decoder = json.JSONDecoder()
+
+
+def first_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """
+    First JSON object embedded in model text, or None
+    
+    raw_decode stops at the end of the object, so trailing prose is never scanned.
+    """
+    start = text.find("{")
+    for _ in range(MAX_JSON_CANDIDATES):
+        if start < 0:
+            break
         try:
-            response = self.anthropic_client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=2000,
-                system=system_prompt,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": user_prompt
-                    }
-                ]
-            )
-            
-            # Extract the content from response
-            content = response.content[0].text
+            value, _end = _decoder.raw_decode(text, start)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        start = text.find("{", start + 1)
+    return None
+
+
+def parse_extraction(content: List[Any]) -> Dict[str, Any]:
+    """
+    Validated extraction from a messages.create response's content blocks
+    
+    Uses the tool call's input when present, else the first JSON object in
+    the text. Output that is not JSON or does not match ExtractedMedicalData
+    is returned as {"raw_extraction", "error"}.
+    """
+    text = "".join(getattr(block, "text", "") for block in content if getattr(block, "type", None) == "text")
+    payload = next(
+        (block.input for block in content if getattr(block, "type", None) == "tool_use"),
+        None
+    )
+    if payload is None:
+        payload = first_json_object(text)
+    if payload is None:
+        return {
+            "raw_extraction": text,
+            "error": "Could not parse as JSON"
+        }
+    
+    try:
+        return ExtractedMedicalData.model_validate(payload).model_dump(exclude_none=True)
+    except ValidationError as e:
+        logger.warning(f"Extraction did not match the schema ({e.error_count()} errors)")
+        return {
+            "raw_extraction": text or json.dumps(payload),
+            "error": "Extraction did not match the expected format"
+        }
+
+
+def intake_fields(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """ComprehensiveIntake field values for extracted data, or None if extraction was not parsed"""
+    if not isinstance(data, dict) or "raw_extraction" in data:
+        return None
+    return ExtractedMedicalData.model_validate(data).intake_fields()
+
+class VoiceIntakeService:
+    """Service for processing voice transcriptions and extracting medical data"""
+    
+    def __init__(self, cache: Optional[ExtractionCache] = None):
+        self.llm_key = os.getenv("EMERGENT_LLM_KEY")
+        self.cache = cache
+        
+        # Calls beyond LLM_MAX_CONCURRENCY wait (up to LLM_QUEUE_TIMEOUT_SECONDS)
+        # instead of piling up connections on this worker
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        self.timeout_seconds = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+        self.queue_timeout_seconds = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        # Long transcripts are extracted in overlapping segments of this size
+        self.segment_chars = int(os.getenv("LLM_SEGMENT_CHARS", "12000"))
+        self.segment_overlap_chars = int(os.getenv("LLM_SEGMENT_OVERLAP_CHARS", "600"))
+        
+        self.anthropic_client = AsyncAnthropic(
+            api_key=self.llm_key,
+            timeout=self.timeout_seconds,
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2"))
+        )
+    
+    async def _create_message(self, queue_timeout: Optional[float] = None, **kwargs):
+        """
+        messages.create under the concurrency limit
+        
+        Raises:
+            asyncio.TimeoutError: if no slot frees up within queue_timeout
+                (default queue_timeout_seconds)
+        """
+        LLM_REQUESTS_WAITING.inc()
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=queue_timeout or self.queue_timeout_seconds)
+        finally:
+            LLM_REQUESTS_WAITING.dec()
+        
+        LLM_REQUESTS_IN_FLIGHT.inc()
+        try:
+            async with track_dependency("anthropic", "messages.create"):
+                return await self.anthropic_client.messages.create(**kwargs)
+        finally:
+            LLM_REQUESTS_IN_FLIGHT.dec()
+            self.semaphore.release()
+    
+    async def extract_medical_data(self, transcript: str) -> Dict[str, Any]:
+        """
+        Extract structured medical data from voice transcription using Claude Sonnet-4
+        
+        Identical transcripts (after whitespace normalization) are answered
+        from the extraction cache when one is configured.
+        
+        Args:
+            transcript: Raw transcription text from Deepgram
             
-            # Parse JSON from response
-            try:
-                medical_data = json.loads(content)
-            except json.JSONDecodeError:
-                # If response is not pure JSON, try to extract JSON from it
-                import re
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    medical_data = json.loads(json_match.group())
-                else:
-                    medical_data = {
-                        "raw_extraction": content,
-                        "error": "Could not parse as JSON"
-                    }
+        Returns:
+            Structured medical data as dictionary
+        """
+        if self.cache is None:
+            return await self._extract(transcript)
+        
+        result = await self.cache.get_or_extract(
+            extraction_key(transcript, MODEL, PROMPT_VERSION),
+            lambda: self._extract(transcript)
+        )
+        return {**result, "raw_transcript": transcript}
+    
+    async def _extract(self, transcript: str) -> Dict[str, Any]:
+        """
+        Run the LLM extraction for a transcript
+        
+        Transcripts longer than LLM_SEGMENT_CHARS are split into overlapping
+        segments that are extracted concurrently (within the LLM concurrency
+        limit) and merged, so wall time follows the longest segment and no
+        single response is truncated by max_tokens.
+        """
+        segments = split_transcript(transcript, self.segment_chars, self.segment_overlap_chars)
+        if len(segments) > 1:
+            logger.info(f"Extracting transcript of {len(transcript)} chars in {len(segments)} segments")
+        
+        # Later segments queue behind earlier ones from the same transcript;
+        # allow each wave of max_concurrency segments one LLM call of extra wait
+        tasks = [
+            asyncio.ensure_future(self._extract_segment(
+                segment,
+                segment_note(i, len(segments)),
+                self.queue_timeout_seconds + (i // self.max_concurrency) * self.timeout_seconds
+            ))
+            for i, segment in enumerate(segments)
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+            medical_data = results[0] if len(results) == 1 else merge_extractions(results)
             
             return {
                 "success": True,
@@ -96,12 +227,56 @@ Provide a structured JSON response with the following format:
                 "raw_transcript": transcript
             }
             
+        except asyncio.TimeoutError:
+            logger.warning(f"LLM extraction queue full ({self.max_concurrency} in flight)")
+            return {
+                "success": False,
+                "error": "Medical data extraction is busy, please retry shortly",
+                "busy": True,
+                "raw_transcript": transcript
+            }
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
                 "raw_transcript": transcript
             }
+        finally:
+            # One failed segment fails the extraction; stop paying for the rest
+            for task in tasks:
+                task.cancel()
+    
+    async def _extract_segment(
+        self,
+        transcript: str,
+        note: Optional[str] = None,
+        queue_timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Extraction for one transcript or segment"""
+        user_prompt = USER_PROMPT.format(transcript=transcript)
+        if note:
+            user_prompt = f"{note}\n\n{user_prompt}"
+        
+        response = await self._create_message(
+            queue_timeout=queue_timeout,
+            model=MODEL,
+            max_tokens=2000,
+            system=SYSTEM_PROMPT,
+            messages=[
+                {
+                    "role": "user",
+                    "content": user_prompt
+                }
+            ],
+            tools=[EXTRACTION_TOOL],
+            tool_choice={"type": "tool", "name": EXTRACTION_TOOL["name"]}
+        )
+        
+        return parse_extraction(response.content)
+    
+    async def close(self):
+        """Close the LLM client's connection pool"""
+        await self.anthropic_client.close()
     
     def format_for_storage(self, medical_data: Dict[str, Any]) -> str:
         """
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+from services.appointment_history import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    appointment_id = ObjectId()
+    start = datetime(2026, 1, 5, 10, 30, 15, 123000, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(start, appointment_id)) == (start, appointment_id)
+
+
+def test_cursor_treats_naive_start_as_utc():
+    appointment_id = ObjectId()
+    start, _ = decode_cursor(encode_cursor(datetime(2026, 1, 5, 10), appointment_id))
+    assert start == datetime(2026, 1, 5, 10, tzinfo=timezone.utc)
+
+
+def test_cursor_without_start():
+    appointment_id = ObjectId()
+    assert decode_cursor(encode_cursor(None, appointment_id)) == (None, appointment_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "bm8tY29sb24=", "MTIzOm5vdC1hbi1pZA=="])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
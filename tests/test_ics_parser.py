@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta, timezone
+
+from services.ics_parser import merge_intervals, parse_busy_intervals, unfold_lines
+
+WINDOW_START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+WINDOW_END = WINDOW_START + timedelta(days=90)
+
+
+def _ts(*args, tz=timezone.utc) -> float:
+    return datetime(*args, tzinfo=tz).timestamp()
+
+
+def _calendar(*events: str) -> str:
+    body = "".join(f"BEGIN:VEVENT\r\n{event}END:VEVENT\r\n" for event in events)
+    return f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\n{body}END:VCALENDAR\r\n"
+
+
+def _busy(feed, window_start=WINDOW_START, window_end=WINDOW_END):
+    starts, ends = parse_busy_intervals(feed, window_start, window_end)
+    return list(zip(starts, ends))
+
+
+def test_unfold_joins_continuation_lines_across_chunks():
+    chunks = ["SUMMARY:Long sum", "mary that\r\n  continues\r\n\t and ends\r\nUID:1\r\n"]
+    assert list(unfold_lines(chunks)) == ["SUMMARY:Long summary that continues and ends", "UID:1"]
+
+
+def test_unfold_handles_missing_trailing_newline():
+    assert list(unfold_lines(["A:1\nB:2\n 3"])) == ["A:1", "B:23"]
+
+
+def test_folded_dtstart_is_parsed():
+    feed = _calendar("DTSTART:20260105T1\r\n 00000Z\r\nDURATION:PT30M\r\n")
+    assert _busy(feed) == [(_ts(2026, 1, 5, 10), _ts(2026, 1, 5, 10, 30))]
+
+
+def test_dtend_and_default_length():
+    feed = _calendar(
+        "DTSTART:20260105T100000Z\r\nDTEND:20260105T120000Z\r\n",
+        "DTSTART:20260106T100000Z\r\n",
+    )
+    assert _busy(feed) == [
+        (_ts(2026, 1, 5, 10), _ts(2026, 1, 5, 12)),
+        (_ts(2026, 1, 6, 10), _ts(2026, 1, 6, 10, 15)),
+    ]
+
+
+def test_tzid_is_resolved():
+    from zoneinfo import ZoneInfo
+
+    feed = _calendar("DTSTART;TZID=America/New_York:20260105T090000\r\nDURATION:PT1H\r\n")
+    start = _ts(2026, 1, 5, 9, tz=ZoneInfo("America/New_York"))
+    assert _busy(feed) == [(start, start + 3600)]
+
+
+def test_prefixed_tzid_is_resolved():
+    feed = _calendar("DTSTART;TZID=/mozilla.org/20050126_1/Pacific/Guam:20260105T090000\r\nDURATION:PT1H\r\n")
+    # Guam is UTC+10 with no DST
+    assert _busy(feed) == [(_ts(2026, 1, 4, 23), _ts(2026, 1, 5))]
+
+
+def test_all_day_event_spans_the_day():
+    feed = _calendar("DTSTART;VALUE=DATE:20260105\r\n")
+    assert _busy(feed) == [(_ts(2026, 1, 5), _ts(2026, 1, 6))]
+
+
+def test_cancelled_and_transparent_events_are_free():
+    feed = _calendar(
+        "DTSTART:20260105T100000Z\r\nSTATUS:CANCELLED\r\n",
+        "DTSTART:20260105T110000Z\r\nTRANSP:TRANSPARENT\r\n",
+    )
+    assert _busy(feed) == []
+
+
+def test_single_event_past_the_window_is_kept():
+    feed = _calendar("DTSTART:20260901T100000Z\r\nDURATION:PT1H\r\n")
+    assert _busy(feed) == [(_ts(2026, 9, 1, 10), _ts(2026, 9, 1, 11))]
+
+
+def test_event_ended_before_the_window_is_dropped():
+    feed = _calendar("DTSTART:20251201T100000Z\r\nDURATION:PT1H\r\n")
+    assert _busy(feed) == []
+
+
+def test_rrule_is_expanded_only_inside_the_window():
+    feed = _calendar("DTSTART:20260105T100000Z\r\nDURATION:PT1H\r\nRRULE:FREQ=WEEKLY\r\n")
+    busy = _busy(feed, window_end=WINDOW_START + timedelta(days=21))
+    assert [start for start, _ in busy] == [
+        _ts(2026, 1, 5, 10), _ts(2026, 1, 12, 10), _ts(2026, 1, 19, 10)
+    ]
+
+
+def test_exdate_removes_an_instance():
+    feed = _calendar(
+        "DTSTART:20260105T100000Z\r\nDURATION:PT1H\r\nRRULE:FREQ=DAILY;COUNT=3\r\n"
+        "EXDATE:20260106T100000Z\r\n"
+    )
+    assert [start for start, _ in _busy(feed)] == [_ts(2026, 1, 5, 10), _ts(2026, 1, 7, 10)]
+
+
+def test_recurrence_id_override_replaces_its_instance():
+    feed = _calendar(
+        "UID:weekly\r\nDTSTART:20260105T100000Z\r\nDURATION:PT1H\r\nRRULE:FREQ=DAILY;COUNT=2\r\n",
+        "UID:weekly\r\nRECURRENCE-ID:20260106T100000Z\r\nDTSTART:20260106T150000Z\r\nDURATION:PT1H\r\n",
+    )
+    assert _busy(feed) == [
+        (_ts(2026, 1, 5, 10), _ts(2026, 1, 5, 11)),
+        (_ts(2026, 1, 6, 15), _ts(2026, 1, 6, 16)),
+    ]
+
+
+def test_cancelled_override_frees_its_instance():
+    feed = _calendar(
+        "UID:daily\r\nDTSTART:20260105T100000Z\r\nDURATION:PT1H\r\nRRULE:FREQ=DAILY;COUNT=2\r\n",
+        "UID:daily\r\nRECURRENCE-ID:20260106T100000Z\r\nDTSTART:20260106T100000Z\r\nSTATUS:CANCELLED\r\n",
+    )
+    assert [start for start, _ in _busy(feed)] == [_ts(2026, 1, 5, 10)]
+
+
+def test_floating_until_is_accepted():
+    feed = _calendar(
+        "DTSTART;TZID=Pacific/Guam:20260105T090000\r\nDURATION:PT30M\r\n"
+        "RRULE:FREQ=DAILY;UNTIL=20260106T090000\r\n"
+    )
+    assert len(_busy(feed)) == 2
+
+
+def test_unparseable_event_is_skipped():
+    feed = _calendar("DTSTART:garbage\r\n", "DTSTART:20260105T100000Z\r\n")
+    assert len(_busy(feed)) == 1
+
+
+def test_merge_intervals_coalesces_overlaps():
+    starts, ends = merge_intervals([(5, 8), (1, 3), (2, 4), (8, 9)])
+    assert list(starts) == [1, 5]
+    assert list(ends) == [4, 9]
@@ -0,0 +1,82 @@
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from services.slot_engine import SlotEngine
+
+GUAM_HOURS = {"start": 8, "end": 22, "timezone": "Pacific/Guam"}
+NEW_YORK_HOURS = {"start": 8, "end": 10, "timezone": "America/New_York"}
+
+
+def _minute(*args, tz=timezone.utc) -> int:
+    return int(datetime(*args, tzinfo=tz).timestamp() // 60)
+
+
+def test_day_offsets_leave_room_for_the_visit():
+    engine = SlotEngine(GUAM_HOURS, increment_minutes=15)
+    offsets = engine.day_offsets(30)
+    assert offsets[0] == 8 * 60
+    assert offsets[-1] == 22 * 60 - 30
+    assert np.all(np.diff(offsets) == 15)
+
+
+def test_day_grid_is_in_utc():
+    engine = SlotEngine(GUAM_HOURS, increment_minutes=15)
+    grid = engine.day_grid(date(2026, 1, 5), 15)
+    # 8:00 AM ChST is 22:00 UTC the previous day
+    assert grid[0] == _minute(2026, 1, 4, 22)
+    assert len(grid) == 14 * 4
+
+
+def test_day_grid_follows_dst():
+    engine = SlotEngine(NEW_YORK_HOURS, increment_minutes=60)
+    before = engine.day_grid(date(2026, 3, 7), 60)
+    after = engine.day_grid(date(2026, 3, 9), 60)
+    assert before.tolist() == [_minute(2026, 3, 7, 13), _minute(2026, 3, 7, 14)]
+    assert after.tolist() == [_minute(2026, 3, 9, 12), _minute(2026, 3, 9, 13)]
+
+
+def test_grid_between_is_half_open():
+    engine = SlotEngine(GUAM_HOURS, increment_minutes=15)
+    guam = ZoneInfo("Pacific/Guam")
+    grid = engine.grid_between(datetime(2026, 1, 5, 9, tzinfo=guam), datetime(2026, 1, 5, 10, tzinfo=guam), 15)
+    assert grid.tolist() == [_minute(2026, 1, 5, 9, tz=guam) + 15 * i for i in range(4)]
+
+
+def test_grid_between_rounds_a_mid_slot_start_up():
+    engine = SlotEngine(GUAM_HOURS, increment_minutes=15)
+    guam = ZoneInfo("Pacific/Guam")
+    grid = engine.grid_between(datetime(2026, 1, 5, 9, 5, tzinfo=guam), datetime(2026, 1, 5, 9, 30, tzinfo=guam), 15)
+    assert grid.tolist() == [_minute(2026, 1, 5, 9, 15, tz=guam)]
+
+
+def test_contains_checks_the_whole_visit():
+    engine = SlotEngine(GUAM_HOURS, increment_minutes=15)
+    guam = ZoneInfo("Pacific/Guam")
+    assert engine.contains(datetime(2026, 1, 5, 21, 30, tzinfo=guam), 30)
+    assert not engine.contains(datetime(2026, 1, 5, 21, 45, tzinfo=guam), 30)
+    assert not engine.contains(datetime(2026, 1, 5, 7, 45, tzinfo=guam), 15)
+
+
+def test_open_mask_without_busy_blocks():
+    slots = np.array([0, 15, 30], dtype=np.int64)
+    assert SlotEngine.open_mask(slots, 15, [], []).tolist() == [True, True, True]
+
+
+def test_open_mask_excludes_overlapping_slots():
+    slots = np.array([0, 15, 30, 45], dtype=np.int64)
+    # Busy 20:00-35:00 (minutes) overlaps the 15 and 30 slots; touching edges do not count
+    mask = SlotEngine.open_mask(slots, 15, [20 * 60], [35 * 60])
+    assert mask.tolist() == [True, False, False, True]
+    assert SlotEngine.open_mask(slots, 15, [15 * 60], [30 * 60]).tolist() == [True, False, True, True]
+
+
+def test_region_slots_use_local_time_across_dst():
+    engine = SlotEngine(GUAM_HOURS, increment_minutes=15)
+    slots = np.array([_minute(2026, 3, 8, 6, 30), _minute(2026, 3, 8, 7, 30)], dtype=np.int64)
+    # New York moves from UTC-5 to UTC-4 at 07:00 UTC
+    assert engine.region_slots(slots, "America/New_York") == [
+        {"date": "2026-03-08", "time": "01:30 AM", "start": "2026-03-08T06:30:00+00:00"},
+        {"date": "2026-03-08", "time": "03:30 AM", "start": "2026-03-08T07:30:00+00:00"},
+    ]
@@ -0,0 +1,84 @@
+from services.transcript_segments import is_blank, merge_extractions, segment_note, split_transcript
+
+
+def test_short_transcript_is_one_segment():
+    assert split_transcript("  Hello there.  ", 100, 10) == ["Hello there."]
+
+
+def test_segments_cover_the_transcript_with_overlap():
+    sentences = [f"Sentence number {i} is here." for i in range(40)]
+    text = " ".join(sentences)
+    segments = split_transcript(text, 200, 40)
+
+    assert len(segments) > 1
+    assert all(len(segment) <= 200 for segment in segments)
+    for sentence in sentences:
+        assert any(sentence in segment for segment in segments)
+    for previous, current in zip(segments, segments[1:]):
+        # Each segment starts inside the previous one
+        assert current.split()[0] in previous
+
+
+def test_segments_end_at_sentence_breaks():
+    text = " ".join(f"Sentence number {i} is here." for i in range(40))
+    segments = split_transcript(text, 200, 40)
+    assert all(segment.endswith(".") for segment in segments)
+
+
+def test_split_without_whitespace_still_terminates():
+    segments = split_transcript("x" * 250, 100, 20)
+    assert "".join(segments).startswith("x" * 100)
+    assert segments[-1].endswith("x")
+
+
+def test_is_blank():
+    assert is_blank(None)
+    assert is_blank(" Not mentioned ")
+    assert is_blank([])
+    assert not is_blank("metformin")
+    assert not is_blank(0)
+
+
+def test_merge_combines_medications_by_name():
+    merged = merge_extractions([
+        {"medications": [{"name": "Metformin", "dosage": "not mentioned"}]},
+        {"medications": [{"name": "metformin", "dosage": "500mg"}, "Lisinopril"]},
+    ])
+    assert merged["medications"] == [
+        {"name": "Metformin", "dosage": "500mg"},
+        {"name": "Lisinopril"},
+    ]
+
+
+def test_merge_deduplicates_list_fields():
+    merged = merge_extractions([
+        {"allergies": ["Penicillin", "none"]},
+        {"allergies": "penicillin ", "concerns": ["Fatigue"]},
+    ])
+    assert merged["allergies"] == ["Penicillin"]
+    assert merged["concerns"] == ["Fatigue"]
+    assert merged["chronic_conditions"] == []
+
+
+def test_merge_keeps_the_last_stated_weight():
+    merged = merge_extractions([
+        {"weight_history": {"current_weight": "210 lbs", "previous_attempts": ["Keto"]}},
+        {"weight_history": {"current_weight": "205 lbs", "current_height": "unknown", "previous_attempts": ["keto", "Phentermine"]}},
+    ])
+    assert merged["weight_history"] == {"current_weight": "205 lbs", "previous_attempts": ["Keto", "Phentermine"]}
+
+
+def test_merge_joins_notes_and_reports_unparsed_segments():
+    merged = merge_extractions([
+        {"additional_notes": "Prefers mornings"},
+        {"raw_extraction": "not json"},
+        {"additional_notes": "prefers mornings"},
+    ])
+    assert merged["additional_notes"] == "Prefers mornings"
+    assert merged["raw_extraction"] == "not json"
+    assert merged["error"] == "Could not parse 1 of 3 segments as JSON"
+
+
+def test_segment_note():
+    assert segment_note(0, 1) is None
+    assert segment_note(1, 3).startswith("This is part 2 of 3")